@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from logging.handlers import RotatingFileHandler
+import subprocess
+
+import board
+import busio
+import digitalio
+import otterworks_drv8305
+import otterworks_drv8305_scheduler
+
+logging.basicConfig(format='%(asctime)s\t%(levelname)s\t%(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S %z', level=logging.DEBUG,
+        handlers=[RotatingFileHandler('drv8305monitor.log',
+            maxBytes=10000000, backupCount=13)])
+
+# on beaglebone black, make sure SPI_0 and SPI_1 pins are configured
+for pin, mode in [("P9_17", "spi_cs"), ("P9_18", "spi"), ("P9_21", "spi"), ("P9_22", "spi_sclk"),
+                  ("P9_28", "spi_cs"), ("P9_29", "spi"), ("P9_30", "spi"), ("P9_31", "spi_sclk")]:
+    subprocess.run(["config-pin", pin, mode])
+
+spi0 = busio.SPI(board.SCK, board.MOSI, board.MISO)
+spi1 = busio.SPI(board.SCK_1, board.MISO_1, board.MOSI_1)
+
+LEVELS = {
+    otterworks_drv8305.DRV8305_FAULT_RAISED: logging.CRITICAL,
+    otterworks_drv8305.DRV8305_FAULT_CLEARED: logging.WARNING,
+    otterworks_drv8305.DRV8305_CONFIG_DRIFT: logging.WARNING,
+    otterworks_drv8305.DRV8305_HEARTBEAT: logging.INFO,
+}
+
+scheduler = otterworks_drv8305_scheduler.DRV8305_Bus_Scheduler()
+monitors = {}
+for name, spi, pin in [("spi0", spi0, board.P9_17), ("spi1", spi1, board.P9_28)]:
+    drv8305 = otterworks_drv8305.OtterWorks_DRV8305(spi, digitalio.DigitalInOut(pin))
+    scheduler.add(drv8305, period=0.5, name=name)
+    monitors[name] = monitor = otterworks_drv8305.DRV8305_Monitor(drv8305, heartbeat_interval=60)
+    monitor.subscribe(lambda event, name=name: logging.log(LEVELS[event.kind], "%s %s", name, event))
+
+for record in scheduler: # one merged stream for every gate driver
+    monitors[record.name].update(record.status)
@@ -28,55 +28,19 @@ spi = busio.SPI(board.SCK_1, board.MISO_1, board.MOSI_1)
 cs = digitalio.DigitalInOut(board.P9_28)
 drv8305 = otterworks_drv8305.OtterWorks_DRV8305(spi, cs)
 
-while True:
-
-    wwr = drv8305._get_warning_watchdog_reset() # TODO: wrap _get methods
-
-    if wwr.fault:
-        level = logging.CRITICAL
-    else:
-        level = logging.INFO
-    logging.log(level, "fault: {}".format(wwr.fault == True))
-
-    if wwr.overtemp:
-        level = logging.CRITICAL
-    else:
-        level = logging.INFO
-    logging.log(level, "overtemperature: {}".format(wwr.overtemp == True))
-
-    if wwr.pvdd_ov:
-        level = logging.CRITICAL
-    else:
-        level = logging.INFO
-    logging.log(level, "PVDD overvoltage: {}".format(wwr.pvdd_ov == True))
+LEVELS = {
+    otterworks_drv8305.DRV8305_FAULT_RAISED: logging.CRITICAL,
+    otterworks_drv8305.DRV8305_FAULT_CLEARED: logging.WARNING,
+    otterworks_drv8305.DRV8305_CONFIG_DRIFT: logging.WARNING,
+    otterworks_drv8305.DRV8305_HEARTBEAT: logging.INFO,
+}
 
-    if wwr.overtemp:
-        level = logging.CRITICAL
-    else:
-        level = logging.INFO
-    logging.log(level, "PVDD undervoltage: {}".format(wwr.pvdd_uv == True))
+monitor = otterworks_drv8305.DRV8305_Monitor(drv8305, heartbeat_interval=60)
 
-    if wwr.overtemp:
-        level = logging.CRITICAL
-    else:
-        level = logging.INFO
-    logging.log(level, "charge pump undervoltage: {}".format(wwr.vchp_uv == True))
-
-    # TODO: temp 1-4, vds_status
-
-    oc = drv8305._get_overcurrent()
-    logging.debug("high-side overcurrents: A = {a}, B = {b}, C = {c}".format(
-        a = (oc.high_a == True), b = (oc.high_b == True), c = (oc.high_c == True)))
-    logging.debug("low-side overcurrents: A = {a}, B = {b}, C = {c}".format(
-        a = (oc.low_a == True), b = (oc.low_b == True), c = (oc.low_c == True)))
-    logging.debug("sense overcurrents: A = {a}, B = {b}, C = {c}".format(
-        a = (oc.sense_a == True), b = (oc.sense_b == True), c = (oc.sense_c == True)))
-
-    drive = drv8305._get_drive_control()
-    logging.debug("active freewheeling: {}".format(drive.active_freewheeling == True))
-    logging.debug("PWM mode: {}".format(drive.pwm_mode))
-    logging.debug("dead time: {}".format(drive.dead_time))
-    logging.debug("blanking: {}".format(drive.vds_sense_blanking))
-    logging.debug("deglitch: {}".format(drive.vds_sense_deglitch))
+@monitor.subscribe
+def log_event(event):
+    logging.log(LEVELS[event.kind], str(event))
 
+while True:
+    monitor.poll() # only logs transitions, plus a heartbeat every minute
     time.sleep(3)
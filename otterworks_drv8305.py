@@ -27,8 +27,22 @@ CircuitPython driver for Texas Instruments DRV8305 Three-Phase Gate Driver
 
 * Author(s): bluesquall
 """
-import ctypes
-from time import sleep
+try:
+    import ctypes # only for the legacy bitfield structures, CircuitPython doesn't have it
+except ImportError:
+    ctypes = None
+try:
+    from threading import Lock
+except ImportError: # CircuitPython has no threads, so nothing to guard against
+    Lock = None
+from array import array
+from collections import namedtuple, OrderedDict
+from time import monotonic, sleep
+try:
+    from time import monotonic_ns # only used with metrics
+except ImportError: # Python before 3.7, and CircuitPython boards without long ints
+    def monotonic_ns():
+        return int(monotonic() * 1e9)
 from micropython import const
 
 
@@ -48,16 +62,96 @@ _DRV8305_SHUNT_AMPLIFIER_CONTROL_REGISTER = const(0x0A)
 _DRV8305_VOLTAGE_REGULATOR_CONTROL_REGISTER = const(0x0B)
 _DRV8305_VDS_SENSE_CONTROL_REGISTER = const(0x0C)
 
+_DRV8305_STATUS_REGISTERS = (_DRV8305_WARNING_WATCHDOG_REGISTER, _DRV8305_OV_VDS_FAULT_REGISTER,
+                             _DRV8305_IC_FAULT_REGISTER, _DRV8305_VGS_FAULT_REGISTER)
+_DRV8305_DATA_MASK = const(0x07FF) # the low 11 bits of a frame carry the register contents
+_DRV8305_READ = const(0x8000) # R/W bit of a frame
+_DRV8305_STATUS_READS = tuple(_DRV8305_READ | register << 11 for register in _DRV8305_STATUS_REGISTERS)
+_DRV8305_SELF_CLEARING = {_DRV8305_IC_OPERATION_REGISTER: 0x0002} # CLR_FLTS reads back as zero
+_DRV8305_CONTROL_REGISTERS = range(_DRV8305_HS_GATE_DRIVE_CONTROL_REGISTER,
+                                   _DRV8305_VDS_SENSE_CONTROL_REGISTER + 1)
+
+# power-on contents of the control registers, from the datasheet register map
+_DRV8305_RESET_WORDS = {
+    _DRV8305_HS_GATE_DRIVE_CONTROL_REGISTER: 0x344,
+    _DRV8305_LS_GATE_DRIVE_CONTROL_REGISTER: 0x344,
+    _DRV8305_GATE_DRIVE_CONTROL_REGISTER: 0x216,
+    _DRV8305_RESERVED_REGISTER: 0x000,
+    _DRV8305_IC_OPERATION_REGISTER: 0x020,
+    _DRV8305_SHUNT_AMPLIFIER_CONTROL_REGISTER: 0x000,
+    _DRV8305_VOLTAGE_REGULATOR_CONTROL_REGISTER: 0x10A,
+    _DRV8305_VDS_SENSE_CONTROL_REGISTER: 0x2C8,
+}
+
+# shadow cache policies for the control registers (0x05 -- 0x0C):
+_DRV8305_CACHE_CACHED = "cached" # reads hit the shadow, writes update it with the data written
+_DRV8305_CACHE_WRITE_THROUGH = "write-through" # like cached, but every write is read back so the shadow holds what the chip latched
+_DRV8305_CACHE_ALWAYS_READ = "always-read" # no shadow, every read is a bus transaction
+_DRV8305_CACHE_POLICIES = (_DRV8305_CACHE_CACHED, _DRV8305_CACHE_WRITE_THROUGH, _DRV8305_CACHE_ALWAYS_READ)
+
+# short register names, matching the _DRV8305_SPI_Word fields
+_DRV8305_REGISTER_NAMES = {
+    _DRV8305_WARNING_WATCHDOG_REGISTER: "wwr",
+    _DRV8305_OV_VDS_FAULT_REGISTER: "oc",
+    _DRV8305_IC_FAULT_REGISTER: "ic_fault",
+    _DRV8305_VGS_FAULT_REGISTER: "vgs",
+    _DRV8305_HS_GATE_DRIVE_CONTROL_REGISTER: "hs",
+    _DRV8305_LS_GATE_DRIVE_CONTROL_REGISTER: "ls",
+    _DRV8305_GATE_DRIVE_CONTROL_REGISTER: "drive",
+    _DRV8305_RESERVED_REGISTER: "reserved",
+    _DRV8305_IC_OPERATION_REGISTER: "ic_op",
+    _DRV8305_SHUNT_AMPLIFIER_CONTROL_REGISTER: "shunt",
+    _DRV8305_VOLTAGE_REGULATOR_CONTROL_REGISTER: "vreg",
+    _DRV8305_VDS_SENSE_CONTROL_REGISTER: "vsen",
+}
+
+# DRV8305_Event kinds
+DRV8305_FAULT_RAISED = "fault raised"
+DRV8305_FAULT_CLEARED = "fault cleared"
+DRV8305_CONFIG_DRIFT = "config drift"
+DRV8305_HEARTBEAT = "heartbeat"
+
 class OtterWorks_DRV8305:
     """Driver for DRV8305 Three-Phase Gate Driver"""
 
-    def __init__(self, spi, cs, baudrate=1000000): # DRV8305 supports up to 10 MHz
-        import adafruit_bus_device.spi_device as spi_device  # pylint: disable=import-outside-toplevel
-        self._spi = spi_device.SPIDevice(spi, chip_select=cs, polarity=0, phase=1) # avoid overwriting polarity & phase
+    def __init__(self, spi, cs, baudrate=1000000, cache_policy=_DRV8305_CACHE_CACHED, verify_interval=None, trace=None, nfault=None, metrics=None, clock_tuner=None): # DRV8305 supports up to 10 MHz
+        if cache_policy not in _DRV8305_CACHE_POLICIES:
+            raise ValueError("cache_policy must be one of {}".format(_DRV8305_CACHE_POLICIES))
+        if cs is None: # spi is already an SPIDevice, or something that behaves like one, e.g. otterworks_drv8305_emulator
+            self._spi = spi
+        else:
+            import adafruit_bus_device.spi_device as spi_device  # pylint: disable=import-outside-toplevel
+            self._spi = spi_device.SPIDevice(spi, chip_select=cs, baudrate=baudrate, polarity=0, phase=1) # avoid overwriting polarity & phase
         self._spi.chip_select.value = True # idle high
         # ^ adafruit_bus_device.spi_device.__init__ switches it to an output with the arg value=True, but I'm seeing it low for ~224 ms on the scope after init if I don't add this
-        self._c = _DRV8305_SPI_Word()
-        self._r = _DRV8305_SPI_Word()
+        self._tx = bytearray(2) # frame buffers, reused by every transaction
+        self._rx = bytearray(2)
+        self._status_tx = bytearray(8) # the four status register reads, back to back
+        for i, word in enumerate(_DRV8305_STATUS_READS):
+            self._status_tx[2 * i] = word >> 8
+        self._status_rx = bytearray(8)
+        # bound once: a with statement would allocate a bound __exit__ on every transaction
+        self._bus_enter = self._spi.__enter__
+        self._bus_exit = self._spi.__exit__
+        self._cache_policy = cache_policy
+        self._verify_interval = verify_interval # seconds before a shadowed register is re-read from the chip, None to trust it forever
+        self._shadow = {} # register -> decoded snapshot, control registers only
+        self._shadow_time = {} # register -> monotonic() when the shadow was last confirmed against the chip
+        self.cache_drift = 0 # number of times the chip disagreed with the shadow
+        self.trace = trace # None, or called as trace(register, tx_word, rx_word, timestamp) after every frame
+        self.metrics = metrics # None, or a DRV8305_Metrics that times every frame, bus session and decode
+        self.clock_tuner = clock_tuner # None, or a DRV8305_Clock_Tuner that checks every frame and steps the clock down on errors
+        if nfault is not None and not hasattr(nfault, "count"):
+            nfault = _NFault_Pin(nfault) # a plain digital input, sample it
+        self.nfault = nfault # falling-edge source for the nFAULT pin, anything with a count that increments per edge
+        self._nfault_count = nfault.count if nfault is not None else 0
+        # adaptive polling for poll_status(), in seconds:
+        self.poll_fast = 0.05 # interval while a warning or fault is present, and for poll_hold after it clears
+        self.poll_slow = 5.0 # heartbeat interval once everything has been clear for a while
+        self.poll_hold = 10.0
+        self._poll_interval = 0 # backs off by doubling, kept within the current poll_fast -- poll_slow on every read
+        self._next_poll = 0
+        self._fast_until = 0
 
     def __repr__(self):
         fmt = """SPI driver for TI DRV8305, configured:
@@ -70,246 +164,1301 @@ class OtterWorks_DRV8305:
         return fmt.format(self)
 
     def _read_register(self, register): # DRV8305 transactions are always 2 bytes
-        print("read register 0x{:02X}".format(register))
-        self._c.control.read = True
-        self._c.control.address = register
-        self._c.control.data = 0
-        print("writing: {}".format(self._c))
-        with self._spi as spi: # this calls __enter__ and __exit__ on SPIDevice; __enter__ sets chip select low, __exit__ sets chip select high
-            spi.write_readinto(self._c, self._r)
-        print("read: {}".format(self._r))
-        return self._r
+        return self._frame(register, 0x80 | register << 3, 0, self._rx, True) # R/W and the address make up the first byte
+
+    def readinto_register(self, register, buf):
+        """Read a register into the first two bytes of ``buf``, most significant byte first
+
+        Nothing is allocated, so this is safe to call from a tight loop.
+        """
+        self._frame(register, 0x80 | register << 3, 0, buf, False)
 
     def _write_register(self, register, data):
-        print("write register 0x{:02X}".format(register))
-        self._c.control.read = False
-        self._c.control.address = register
-        self._c.control.data = data
-        print("writing: {}".format(self._c))
-        with self._spi as spi: # handles chip select toggle
-            spi.write_readinto(self._c, self._r)
-        print("read: {}".format(self._r))
-        return self._r
+        word = self._frame(register, register << 3 | (data >> 8) & 0x07, data & 0xFF, self._rx, True)
+        if register in _DRV8305_CONTROL_REGISTERS:
+            if self._cache_policy == _DRV8305_CACHE_CACHED: # CLR_FLTS reads back as zero, so don't shadow it
+                self._store_shadow(register, data & _DRV8305_DATA_MASK & ~_DRV8305_SELF_CLEARING.get(register, 0))
+            elif self._cache_policy == _DRV8305_CACHE_WRITE_THROUGH:
+                self._store_shadow(register, self._read_register(register) & _DRV8305_DATA_MASK)
+        return word
+
+    def _frame(self, register, high_byte, low_byte, buf, word):
+        # one frame in its own bus session: the shared _tx, and _rx when it is buf, are only touched
+        # while the bus is locked, or another thread's frame could go out in their place; returns
+        # the word read if asked, building it allocates
+        spi = self._begin()
+        try:
+            self._tx[0] = high_byte
+            self._tx[1] = low_byte
+            if self.metrics is None:
+                spi.write_readinto(self._tx, buf, in_end=2)
+            else:
+                start = monotonic_ns()
+                spi.write_readinto(self._tx, buf, in_end=2)
+                self.metrics.frame(register, not high_byte & 0x80, monotonic_ns() - start)
+            if self.clock_tuner is not None:
+                self.clock_tuner.frame(self, buf[0])
+            if self.trace is not None:
+                self._trace_frame(register, self._tx, buf, 0)
+            return (buf[0] << 8) | buf[1] if word else None
+        finally:
+            self._bus_exit(None, None, None)
+
+    def _begin(self):
+        # SPIDevice.__enter__ locks the bus, configures it and sets chip select low; __exit__ undoes it
+        if self.metrics is None:
+            return self._bus_enter()
+        start = monotonic_ns()
+        spi = self._bus_enter()
+        self.metrics.acquire(monotonic_ns() - start)
+        return spi
+
+    def _decode_register(self, register, word):
+        if self.metrics is None:
+            return DRV8305_SNAPSHOTS.get(register, word)
+        start = monotonic_ns()
+        snapshot = DRV8305_SNAPSHOTS.get(register, word)
+        self.metrics.decode(monotonic_ns() - start)
+        return snapshot
+
+    def _trace_frame(self, register, tx, rx, i):
+        self.trace(register, (tx[i] << 8) | tx[i + 1], (rx[i] << 8) | rx[i + 1], monotonic())
+
+    def _store_shadow(self, register, data):
+        shadow = self._shadow[register] = self._decode_register(register, data)
+        self._shadow_time[register] = monotonic()
+        return shadow
+
+    def _fill_shadow(self, register):
+        data = self._read_register(register) & _DRV8305_DATA_MASK
+        shadow = self._shadow.get(register)
+        if shadow is not None and shadow.as_word != data:
+            self.cache_drift += 1
+            if self.clock_tuner is not None:
+                self.clock_tuner.error(self)
+        return self._store_shadow(register, data)
+
+    def _read_control_register(self, register):
+        if self._cache_policy != _DRV8305_CACHE_ALWAYS_READ:
+            shadow = self._shadow.get(register)
+            if shadow is not None and (self._verify_interval is None
+                    or monotonic() - self._shadow_time[register] < self._verify_interval):
+                return shadow
+            return self._fill_shadow(register)
+        return self._decode_register(register, self._read_register(register))
+
+    def refresh(self):
+        """Read every control register (0x05 -- 0x0C) from the chip into the shadow cache
+
+        Returns a dict of register -> decoded snapshot.
+        """
+        return {register: self._fill_shadow(register) for register in _DRV8305_CONTROL_REGISTERS}
+
+    def verify(self):
+        """Re-read the shadowed control registers and return the list of those that drifted"""
+        drifted = []
+        for register in sorted(self._shadow):
+            before = self.cache_drift
+            self._fill_shadow(register)
+            if self.cache_drift != before:
+                drifted.append(register)
+        return drifted
+
+    def invalidate(self):
+        """Drop the shadow cache, e.g. after toggling EN_GATE or power cycling the chip"""
+        self._shadow.clear()
+        self._shadow_time.clear()
+
+    def read_status(self):
+        """Read the four fault/status registers (0x01 -- 0x04) in one bus session
+
+        The bus is locked and configured once, and chip select is only toggled
+        between frames, so this is much cheaper than the four ``_get_*`` calls.
+        Returns an immutable :class:`DRV8305_Status` snapshot.
+        """
+        spi = self._begin()
+        try:
+            return self._read_status_frames(spi)
+        finally:
+            self._bus_exit(None, None, None)
+
+    def readinto_status(self, buf):
+        """Read the four status registers into ``buf`` in one bus session, without allocating
+
+        ``buf`` is a caller-owned writable buffer of at least 8 bytes, which gets
+        the words of registers 0x01 -- 0x04, most significant byte first. Returns
+        True when no warning or fault flag is set; otherwise
+        ``DRV8305_Status.from_buffer(buf)`` gives the decoded snapshot.
+        """
+        spi = self._begin()
+        try:
+            self._status_frames_into(spi, buf)
+        finally:
+            self._bus_exit(None, None, None)
+        return not ((buf[0] | buf[2] | buf[4] | buf[6]) & 0x07 or buf[1] or buf[3] or buf[5] or buf[7])
+
+    def _exchange(self, tx_words):
+        # clock out whole frames in one bus session, returns the words read back
+        spi = self._begin()
+        try:
+            return self._exchange_frames(spi, tx_words)
+        finally:
+            self._bus_exit(None, None, None)
+
+    def _exchange_frames(self, spi, tx_words):
+        # the bus must already be locked and configured, with chip select low
+        rx_words = []
+        for i, word in enumerate(tx_words):
+            if i: # end the previous frame, the chip latches each 16-bit word on the rising edge
+                self._spi.chip_select.value = True
+                self._spi.chip_select.value = False
+            self._tx[0] = word >> 8
+            self._tx[1] = word & 0xFF
+            if self.metrics is None:
+                spi.write_readinto(self._tx, self._rx)
+            else:
+                start = monotonic_ns()
+                spi.write_readinto(self._tx, self._rx)
+                self.metrics.frame((word >> 11) & 0xF, not word & _DRV8305_READ, monotonic_ns() - start)
+            rx_words.append((self._rx[0] << 8) | self._rx[1])
+            if self.clock_tuner is not None:
+                self.clock_tuner.frame(self, self._rx[0])
+            if self.trace is not None:
+                self._trace_frame((word >> 11) & 0xF, self._tx, self._rx, 0)
+        return rx_words
+
+    def _status_frames_into(self, spi, buf):
+        # as _exchange_frames, for the status reads; nothing here may allocate, hence no for loop
+        i = 0
+        while i < 8:
+            if i:
+                self._spi.chip_select.value = True
+                self._spi.chip_select.value = False
+            if self.metrics is None:
+                spi.write_readinto(self._status_tx, buf, out_start=i, out_end=i + 2, in_start=i, in_end=i + 2)
+            else:
+                start = monotonic_ns()
+                spi.write_readinto(self._status_tx, buf, out_start=i, out_end=i + 2, in_start=i, in_end=i + 2)
+                self.metrics.frame(1 + i // 2, False, monotonic_ns() - start)
+            if self.clock_tuner is not None:
+                self.clock_tuner.frame(self, buf[i])
+            if self.trace is not None:
+                self._trace_frame(1 + i // 2, self._status_tx, buf, i)
+            i += 2
+        if self.metrics is not None:
+            self.metrics.status_buffer(buf)
+        if buf[4] & 0x06 or buf[5] & 0x40: # PVDD_UVLO2, WD_FAULT or VREG_UV in the IC fault register
+            self.invalidate() # the chip may have reset its control registers to defaults
+
+    def _read_status_frames(self, spi):
+        self._status_frames_into(spi, self._status_rx)
+        return DRV8305_Status.from_buffer(self._status_rx)
+
+    def poll_status(self):
+        """Read the status registers if nFAULT fell or the polling interval elapsed
+
+        Returns a :class:`DRV8305_Status`, or None if no read was needed. The
+        interval drops to ``poll_fast`` whenever a flag is set, stays there for
+        ``poll_hold`` seconds after the flags clear, then doubles on every clear
+        read up to ``poll_slow``. Changes to ``poll_fast``, ``poll_slow`` and
+        ``poll_hold`` apply from the next read. Checking the edge source does
+        not touch SPI.
+        """
+        edge = False
+        if self.nfault is not None:
+            count = self.nfault.count
+            edge = count != self._nfault_count
+            self._nfault_count = count
+        if not edge and monotonic() < self._next_poll:
+            return None
+        status = self.read_status()
+        interval = min(max(self._poll_interval, self.poll_fast), self.poll_slow) # either may have been changed
+        if not status.clear:
+            interval = self.poll_fast
+            self._fast_until = status.timestamp + self.poll_hold
+        elif status.timestamp >= self._fast_until:
+            interval = min(2 * interval, self.poll_slow)
+        self._poll_interval = interval
+        self._next_poll = status.timestamp + interval
+        return status
+
+    def watch(self, check_interval=0.001):
+        """Yield status snapshots forever, as read by :meth:`poll_status`
+
+        With an nFAULT source the edge is checked every ``check_interval``
+        seconds between reads; without one this just sleeps until the next read.
+        """
+        while True:
+            status = self.poll_status()
+            if status is not None:
+                yield status
+                continue
+            delay = max(0, self._next_poll - monotonic())
+            sleep(delay if self.nfault is None else min(check_interval, delay))
+
+    def _write_control_register(self, register, data):
+        # data is a register snapshot, e.g. from a _get_* with fields replaced, or a raw word
+        if not isinstance(data, int):
+            data = data.as_word
+        self._write_register(register, data & _DRV8305_DATA_MASK)
+
+    def configure(self):
+        """Start a :class:`DRV8305_Configuration` transaction on the control registers
+
+        .. code-block:: python
+
+            with drv8305.configure() as config:
+                config.set("drive", dead_time=3)
+                config.set("shunt", gain_1=2, gain_2=2, gain_3=2)
+        """
+        return DRV8305_Configuration(self)
+
+    def _apply(self, staged):
+        # staged is register -> {field: value}; returns the registers written
+        current = {}
+        if self._cache_policy != _DRV8305_CACHE_ALWAYS_READ:
+            for register in staged:
+                if register in self._shadow:
+                    current[register] = self._shadow[register].as_word
+        unknown = [register for register in sorted(staged) if register not in current]
+        if unknown:
+            for register, word in zip(unknown, self._exchange([_DRV8305_READ | register << 11 for register in unknown])):
+                current[register] = word & _DRV8305_DATA_MASK
+        target = {}
+        for register, fields in staged.items():
+            target[register] = _decode(register, current[register])._replace(**fields).as_word & _DRV8305_DATA_MASK
+        changed = [register for register in sorted(target) if target[register] != current[register]]
+        if not changed:
+            return changed
+        tx_words = [register << 11 | target[register] for register in changed]
+        tx_words += [_DRV8305_READ | register << 11 for register in changed]
+        readback = self._exchange(tx_words)[len(changed):]
+        mismatched = []
+        for register, word in zip(changed, readback):
+            word &= _DRV8305_DATA_MASK
+            if self._cache_policy != _DRV8305_CACHE_ALWAYS_READ:
+                self._store_shadow(register, word)
+            if word != target[register] & ~_DRV8305_SELF_CLEARING.get(register, 0):
+                mismatched.append("0x{:02X} wrote 0x{:03X} read 0x{:03X}".format(register, target[register], word))
+        if mismatched:
+            raise RuntimeError("DRV8305 configuration did not verify: " + ", ".join(mismatched))
+        return changed
+
+    def _read_status_register(self, register):
+        word = self._read_register(register)
+        if self.metrics is not None:
+            self.metrics.status_word(register, word)
+        return self._decode_register(register, word)
 
     def _get_warning_watchdog_reset(self):
-        return self._read_register(_DRV8305_WARNING_WATCHDOG_REGISTER).wwr
+        return self._read_status_register(_DRV8305_WARNING_WATCHDOG_REGISTER)
 
     def _get_overcurrent(self):
-        return self._read_register(_DRV8305_OV_VDS_FAULT_REGISTER).oc
+        return self._read_status_register(_DRV8305_OV_VDS_FAULT_REGISTER)
 
     def _get_ic_fault(self):
-        return self._read_register(_DRV8305_IC_FAULT_REGISTER).ic_fault
+        ic_fault = self._read_status_register(_DRV8305_IC_FAULT_REGISTER)
+        if ic_fault.watchdog or ic_fault.pvdd_uv_2 or ic_fault.vreg_uv:
+            self.invalidate() # the chip may have reset its control registers to defaults
+        return ic_fault
 
     def _get_vgs_fault(self):
-        return self._read_register(_DRV8305_VGS_FAULT_REGISTER).vgs
+        return self._read_status_register(_DRV8305_VGS_FAULT_REGISTER)
 
     def _get_high_gate_control(self):
-        return self._read_register(_DRV8305_HS_GATE_DRIVE_CONTROL_REGISTER).hs
+        return self._read_control_register(_DRV8305_HS_GATE_DRIVE_CONTROL_REGISTER)
 
     def _set_high_gate_control(self, data):
-        raise NotImplementedError
+        self._write_control_register(_DRV8305_HS_GATE_DRIVE_CONTROL_REGISTER, data)
 
     def _get_low_gate_control(self):
-        return self._read_register(_DRV8305_LS_GATE_DRIVE_CONTROL_REGISTER).ls
+        return self._read_control_register(_DRV8305_LS_GATE_DRIVE_CONTROL_REGISTER)
 
     def _set_low_gate_control(self, data):
-        raise NotImplementedError
+        self._write_control_register(_DRV8305_LS_GATE_DRIVE_CONTROL_REGISTER, data)
 
     def _get_drive_control(self):
-        return self._read_register(_DRV8305_GATE_DRIVE_CONTROL_REGISTER).drive
+        return self._read_control_register(_DRV8305_GATE_DRIVE_CONTROL_REGISTER)
 
     def _set_drive_control(self, data):
-        raise NotImplementedError
+        self._write_control_register(_DRV8305_GATE_DRIVE_CONTROL_REGISTER, data)
 
     def _get_ic_operation(self):
-        return self._read_register(_DRV8305_IC_OPERATION_REGISTER).ic_op
+        return self._read_control_register(_DRV8305_IC_OPERATION_REGISTER)
 
     def _set_ic_operation(self, data):
-        raise NotImplementedError
+        self._write_control_register(_DRV8305_IC_OPERATION_REGISTER, data)
 
     def _get_shunt_amplifier(self):
-        return self._read_register(_DRV8305_SHUNT_AMPLIFIER_CONTROL_REGISTER).shunt
+        return self._read_control_register(_DRV8305_SHUNT_AMPLIFIER_CONTROL_REGISTER)
 
     def _set_shunt_amplifier(self, data):
-        raise NotImplementedError
+        self._write_control_register(_DRV8305_SHUNT_AMPLIFIER_CONTROL_REGISTER, data)
 
     def _get_voltage_regulator(self):
-        return self._read_register(_DRV8305_VOLTAGE_REGULATOR_CONTROL_REGISTER).vreg
+        return self._read_control_register(_DRV8305_VOLTAGE_REGULATOR_CONTROL_REGISTER)
 
     def _set_voltage_regulator(self, data):
-        raise NotImplementedError
+        self._write_control_register(_DRV8305_VOLTAGE_REGULATOR_CONTROL_REGISTER, data)
 
     def _get_voltage_sense(self):
-        return self._read_register(_DRV8305_VDS_SENSE_CONTROL_REGISTER).vsen
+        return self._read_control_register(_DRV8305_VDS_SENSE_CONTROL_REGISTER)
 
     def _set_voltage_sense(self, data):
-        raise NotImplementedError
-
-class _Control(ctypes.BigEndianStructure):
-    _fields_ = [
-                ("read", ctypes.c_uint8, 1),
-                ("address", ctypes.c_uint8, 4),
-                ("data", ctypes.c_uint16, 11)
-            ]
-
-class _Warning_Watchdog_Reset_Flags(ctypes.BigEndianStructure):
-    _fields_ = [
-                ("empty", ctypes.c_uint8, 5),
-                ("fault", ctypes.c_uint8, 1),
-                ("reserved", ctypes.c_uint8, 1),
-                ("temp4", ctypes.c_uint8, 1),
-                ("pvdd_uv", ctypes.c_uint8, 1),
-                ("pvdd_ov", ctypes.c_uint8, 1),
-                ("vds_status", ctypes.c_uint8, 1),
-                ("vchp_uv", ctypes.c_uint8, 1),
-                ("temp1", ctypes.c_uint8, 1),
-                ("temp2", ctypes.c_uint8, 1),
-                ("temp3", ctypes.c_uint8, 1),
-                ("overtemp", ctypes.c_uint8, 1),
-            ]
-
-class _Overcurrent_Flags(ctypes.BigEndianStructure):
-    _fields_ = [
-                ("empty", ctypes.c_uint8, 5),
-                ("high_a", ctypes.c_uint8, 1),
-                ("low_a", ctypes.c_uint8, 1),
-                ("high_b", ctypes.c_uint8, 1),
-                ("low_b", ctypes.c_uint8, 1),
-                ("high_c", ctypes.c_uint8, 1),
-                ("low_c", ctypes.c_uint8, 1),
-                ("reserved", ctypes.c_uint8, 2),
-                ("sense_c", ctypes.c_uint8, 1),
-                ("sense_b", ctypes.c_uint8, 1),
-                ("sense_a", ctypes.c_uint8, 1),
-            ]
-
-class _IC_Fault_Flags(ctypes.BigEndianStructure):
-    _fields_ = [
-                ("empty", ctypes.c_uint8, 5),
-                ("pvdd_uv_2", ctypes.c_uint8, 1),
-                ("watchdog", ctypes.c_uint8, 1),
-                ("overtemp", ctypes.c_uint8, 1),
-                ("reserved", ctypes.c_uint8, 1),
-                ("vreg_uv", ctypes.c_uint8, 1),
-                ("avdd_uv", ctypes.c_uint8, 1),
-                ("low_gate_supply", ctypes.c_uint8, 1),
-                ("reserved_2", ctypes.c_uint8, 1),
-                ("high_charge_pump_uv_2", ctypes.c_uint8, 1),
-                ("high_charge_pump_ov", ctypes.c_uint8, 1),
-                ("high_charge_pump_ov_abs", ctypes.c_uint8, 1),
-            ]
-
-class _VGS_Fault_Flags(ctypes.BigEndianStructure):
-    _fields_ = [
-                ("empty", ctypes.c_uint8, 5),
-                ("high_a", ctypes.c_uint8, 1),
-                ("low_a", ctypes.c_uint8, 1),
-                ("high_b", ctypes.c_uint8, 1),
-                ("low_b", ctypes.c_uint8, 1),
-                ("high_c", ctypes.c_uint8, 1),
-                ("low_c", ctypes.c_uint8, 1),
-                ("reserved", ctypes.c_uint8, 5),
-            ]
-
-class _Gate_Control(ctypes.BigEndianStructure):
-    _fields_ = [
-                ("empty", ctypes.c_uint8, 5),
-                ("reserved", ctypes.c_uint8, 1),
-                ("t_driven", ctypes.c_uint8, 2),
-                ("i_peak_sink", ctypes.c_uint8, 4),
-                ("i_peak_source", ctypes.c_uint8, 4),
-            ]
-
-class _Drive_Control(ctypes.BigEndianStructure):
-    _fields_ = [
-                ("empty", ctypes.c_uint8, 5),
-                ("reserved", ctypes.c_uint8, 1),
-                ("active_freewheeling", ctypes.c_uint8, 1),
-                ("pwm_mode_msb", ctypes.c_uint8, 1),
-                ("pwm_mode_lsb", ctypes.c_uint8, 1),
-                ("dead_time", ctypes.c_uint8, 3),
-                ("vds_sense_blanking", ctypes.c_uint8, 2),
-                ("vds_sense_deglitch", ctypes.c_uint8, 2),
-            ]
+        self._write_control_register(_DRV8305_VDS_SENSE_CONTROL_REGISTER, data)
+
+class _NFault_Pin:
+    """Counts falling edges on a plain digital input by sampling it whenever count is read"""
+
+    def __init__(self, pin):
+        self._pin = pin
+        self._high = True # nFAULT is open drain, pulled up when there is no fault
+        self._count = 0
+
+    @property
+    def count(self):
+        high = self._pin.value
+        if self._high and not high:
+            self._count += 1
+        self._high = high
+        return self._count
+
+class DRV8305_Edge_Counter:
+    """Software nFAULT edge source
+
+    Call :meth:`fall` from a GPIO edge callback, or from a test. On
+    CircuitPython a ``countio.Counter(pin, edge=countio.Edge.FALL)`` can be
+    passed as ``nfault`` directly.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def fall(self):
+        self.count += 1
+
+def print_trace(register, tx_word, rx_word, timestamp):
+    """Trace callback that prints every frame, like the driver used to do unconditionally"""
+    print("{:.6f} register 0x{:02X} wrote 0x{:04X} read 0x{:04X}".format(timestamp, register, tx_word, rx_word))
+
+class DRV8305_Trace_Ring:
+    """Trace callback that keeps the last ``size`` frames in preallocated arrays
+
+    Recording a frame is four array stores, nothing is formatted. Iterating
+    yields ``(register, tx_word, rx_word, timestamp)`` tuples, oldest first.
+    """
+
+    def __init__(self, size=256):
+        self._register = array("B", bytes(size))
+        self._tx = array("H", bytes(2 * size))
+        self._rx = array("H", bytes(2 * size))
+        self._timestamp = array("d", bytes(8 * size))
+        self._size = size
+        self._next = 0 # total number of frames recorded, the write index is this modulo size
+
+    def __call__(self, register, tx_word, rx_word, timestamp):
+        i = self._next % self._size
+        self._register[i] = register
+        self._tx[i] = tx_word
+        self._rx[i] = rx_word
+        self._timestamp[i] = timestamp
+        self._next += 1
+
+    def __len__(self):
+        return min(self._next, self._size)
+
+    def __iter__(self):
+        for n in range(self._next - len(self), self._next):
+            i = n % self._size
+            yield self._register[i], self._tx[i], self._rx[i], self._timestamp[i]
+
+    def clear(self):
+        self._next = 0
+
+# latency histogram bucket upper bounds for DRV8305_Metrics, in seconds
+DRV8305_LATENCY_BUCKETS = (10e-6, 25e-6, 50e-6, 100e-6, 250e-6, 500e-6, 1e-3, 2.5e-3, 5e-3, 10e-3, 25e-3)
+
+class _Histogram:
+    """Fixed-bucket latency histogram in integer nanoseconds, Prometheus style"""
+
+    def __init__(self, bounds):
+        self._bounds = bounds # upper bounds in ns, ascending
+        self.counts = array("L", [0] * (len(bounds) + 1)) # the last bucket is +Inf
+        self.sum = 0 # ns
+
+    def observe(self, ns):
+        i = 0
+        while i < len(self._bounds) and ns > self._bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += ns
+
+class DRV8305_Metrics:
+    """Opt-in counters and latency histograms, pass one as ``metrics`` to the driver
+
+    Times every SPI frame (per register, read or write), every bus session
+    (locking, configuring and selecting the SPIDevice) and every decode of a
+    raw word into a snapshot, and counts each time a status flag goes from
+    clear to set. With ``metrics=None`` the driver does none of this. See
+    :func:`prometheus_text` to export the numbers.
+    """
+
+    def __init__(self, device="drv8305", buckets=DRV8305_LATENCY_BUCKETS):
+        self.device = device # the device label of every exported sample
+        self._buckets = buckets
+        self._bounds = tuple(int(bound * 1e9) for bound in buckets)
+        self.frames = {} # (register, write) -> _Histogram
+        self.bus_acquire = _Histogram(self._bounds)
+        self.decoding = _Histogram(self._bounds)
+        self.faults = {} # (register, field) -> number of times the flag was raised
+        self._status = {register: 0 for register in _DRV8305_STATUS_REGISTERS}
+        self._lock = Lock() if Lock is not None else _No_Lock() # frames and faults gain keys while an exporter reads them
+
+    def frame(self, register, write, ns):
+        histogram = self.frames.get((register, write))
+        if histogram is None:
+            with self._lock:
+                histogram = self.frames[(register, write)] = _Histogram(self._bounds)
+        histogram.observe(ns)
+
+    def acquire(self, ns):
+        self.bus_acquire.observe(ns)
+
+    def decode(self, ns):
+        self.decoding.observe(ns)
+
+    def status_word(self, register, word):
+        raised = word & ~self._status[register] & _DRV8305_DATA_MASK
+        self._status[register] = word
+        if not raised:
+            return
+        layout = _DRV8305_REGISTER_TYPES[register]._layout
+        for field, (shift, mask) in zip(_DRV8305_REGISTER_TYPES[register]._fields, layout):
+            if (raised >> shift) & mask and not (field.startswith("empty") or field.startswith("reserved")):
+                with self._lock:
+                    self.faults[(register, field)] = self.faults.get((register, field), 0) + 1
+
+    def status_buffer(self, buf):
+        for i, register in enumerate(_DRV8305_STATUS_REGISTERS):
+            self.status_word(register, (buf[2 * i] << 8) | buf[2 * i + 1])
+
+    def _histogram_lines(self, name, labels, histogram):
+        lines = []
+        total = 0
+        for bound, count in zip(self._buckets, histogram.counts):
+            total += count
+            lines.append('{}_bucket{{{},le="{:g}"}} {}'.format(name, labels, bound, total))
+        total += histogram.counts[-1]
+        lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(name, labels, total))
+        lines.append("{}_sum{{{}}} {:.9f}".format(name, labels, histogram.sum / 1e9))
+        lines.append("{}_count{{{}}} {}".format(name, labels, total))
+        return lines
+
+def prometheus_text(*metrics):
+    """Render one or more :class:`DRV8305_Metrics` in the Prometheus text exposition format"""
+    frames = ["# HELP drv8305_frame_seconds Time to clock one 16-bit SPI frame",
+              "# TYPE drv8305_frame_seconds histogram"]
+    acquire = ["# HELP drv8305_bus_acquire_seconds Time to lock, configure and select the SPI device",
+               "# TYPE drv8305_bus_acquire_seconds histogram"]
+    decode = ["# HELP drv8305_decode_seconds Time to decode a register word into a snapshot",
+              "# TYPE drv8305_decode_seconds histogram"]
+    faults = ["# HELP drv8305_faults_total Number of times a warning or fault flag was raised",
+              "# TYPE drv8305_faults_total counter"]
+    for m in metrics:
+        device = 'device="{}"'.format(m.device)
+        with m._lock:
+            frame_items = list(m.frames.items())
+            fault_items = list(m.faults.items())
+        for (register, write), histogram in sorted(frame_items):
+            labels = '{},register="{}",direction="{}"'.format(
+                device, _DRV8305_REGISTER_NAMES[register], "write" if write else "read")
+            frames += m._histogram_lines("drv8305_frame_seconds", labels, histogram)
+        acquire += m._histogram_lines("drv8305_bus_acquire_seconds", device, m.bus_acquire)
+        decode += m._histogram_lines("drv8305_decode_seconds", device, m.decoding)
+        for (register, field), count in sorted(fault_items):
+            faults.append('drv8305_faults_total{{{},register="{}",flag="{}"}} {}'.format(
+                device, _DRV8305_REGISTER_NAMES[register], field, count))
+    return "\n".join(frames + acquire + decode + faults) + "\n"
+
+def write_prometheus_textfile(path, *metrics):
+    """Write :func:`prometheus_text` for node_exporter's textfile collector
+
+    The text goes to ``path + ".tmp"`` first and is renamed over ``path``, so
+    the collector never reads a partial file.
+    """
+    import os # pylint: disable=import-outside-toplevel
+    with open(path + ".tmp", "w") as f:
+        f.write(prometheus_text(*metrics))
+    os.rename(path + ".tmp", path)
+
+def serve_prometheus(*metrics, port=9305, address="127.0.0.1"):
+    """Serve :func:`prometheus_text` over HTTP from a daemon thread, CPython only
+
+    Every GET renders the current numbers. Returns the server, call its
+    ``shutdown()`` to stop it.
+    """
+    # pylint: disable=import-outside-toplevel
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from threading import Thread
+
+    class _Server(ThreadingMixIn, HTTPServer): # http.server.ThreadingHTTPServer, which needs Python 3.7
+        daemon_threads = True
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self): # pylint: disable=invalid-name
+            body = prometheus_text(*metrics).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args): # pylint: disable=arguments-differ
+            pass # one line on stderr per scrape is just noise
+
+    server = _Server((address, port), _Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# SPI clock rates tried by DRV8305_Clock_Tuner, the chip is specified up to 10 MHz
+DRV8305_BAUDRATES = (1000000, 2000000, 3000000, 4000000, 5000000, 6000000, 8000000, 10000000)
+
+_DRV8305_TEST_PATTERNS = (0x555, 0x2AA, 0x7FF, 0x000) # walked through the shunt amplifier register
+
+class DRV8305_Clock_Tuner:
+    """Finds the fastest SPI clock the wiring tolerates, and backs off when frames go bad
+
+    :meth:`calibrate` steps up through ``rates``. At each rate it writes test
+    patterns to the shunt amplifier control register (0x0A) and reads each
+    back, then reads the gate drive control registers and the reserved
+    register ``trials`` times and checks they never change. It settles
+    ``margin`` steps below the fastest rate that passed, restores 0x0A, then
+    re-reads all eight control registers at the final rate and writes back any
+    that a corrupted write frame changed on the way. Calibrate with EN_GATE
+    low: the current sense gains change while it runs.
+
+    Pass the tuner to the driver as ``clock_tuner`` to count frame errors at
+    runtime: every control register that reads back different from the shadow
+    cache counts as one. The datasheet's SPI format (SLVSCX2, "SPI Format")
+    lists the 5 SDO bits above the register contents as don't care, so they
+    are only checked with ``high_bits=True``, for parts seen to clock out
+    zeros there. More than ``max_errors`` in ``window`` frames steps the clock
+    down one rate.
+    """
+
+    def __init__(self, rates=DRV8305_BAUDRATES, margin=1, trials=16, window=1000, max_errors=2, high_bits=False):
+        self.rates = tuple(sorted(rates))
+        self.margin = margin
+        self.trials = trials
+        self.window = window
+        self.max_errors = max_errors
+        self.high_bits = high_bits
+        self.frame_errors = 0 # since the tuner was made
+        self.step_downs = 0
+        self._frames = 0 # in the current window
+        self._errors = 0
+
+    def calibrate(self, drv8305):
+        """Select and set the clock rate; returns it, or raises RuntimeError if no rate passes"""
+        device = drv8305._spi
+        baseline = device.baudrate
+        runtime, drv8305.clock_tuner = drv8305.clock_tuner, None # errors are expected here, don't step down on them
+        try:
+            expected = self._read_words(drv8305)
+            passed = -1
+            try:
+                for i, rate in enumerate(self.rates):
+                    device.baudrate = rate
+                    if not self._check(drv8305, expected):
+                        break
+                    passed = i
+            finally:
+                device.baudrate = self.rates[max(0, passed - self.margin)] if passed >= 0 else baseline
+                self._restore(drv8305, expected)
+        finally:
+            drv8305.clock_tuner = runtime
+        if passed < 0:
+            raise RuntimeError("DRV8305 SPI did not verify at any of {} Hz".format(self.rates))
+        self._frames = self._errors = 0
+        return device.baudrate
+
+    def _read_words(self, drv8305):
+        registers = _DRV8305_CONTROL_REGISTERS
+        words = drv8305._exchange([_DRV8305_READ | register << 11 for register in registers])
+        return {register: word & _DRV8305_DATA_MASK for register, word in zip(registers, words)}
+
+    def _check(self, drv8305, expected):
+        shunt = _DRV8305_SHUNT_AMPLIFIER_CONTROL_REGISTER
+        tx_words = []
+        for pattern in _DRV8305_TEST_PATTERNS:
+            tx_words += [shunt << 11 | pattern, _DRV8305_READ | shunt << 11]
+        readback = drv8305._exchange(tx_words)[1::2]
+        if tuple(word & _DRV8305_DATA_MASK for word in readback) != _DRV8305_TEST_PATTERNS:
+            return False
+        stable = (_DRV8305_HS_GATE_DRIVE_CONTROL_REGISTER, _DRV8305_LS_GATE_DRIVE_CONTROL_REGISTER,
+                  _DRV8305_GATE_DRIVE_CONTROL_REGISTER, _DRV8305_RESERVED_REGISTER)
+        words = drv8305._exchange([_DRV8305_READ | register << 11 for register in stable] * self.trials)
+        return all(word & _DRV8305_DATA_MASK == expected[register] for register, word in zip(stable * self.trials, words))
+
+    def _restore(self, drv8305, expected):
+        # put 0x0A back, then undo anything a corrupted write frame hit: a flipped address bit lands the data elsewhere
+        shunt = _DRV8305_SHUNT_AMPLIFIER_CONTROL_REGISTER
+        drv8305._exchange([shunt << 11 | expected[shunt]])
+        words = self._read_words(drv8305)
+        changed = sorted(register for register in words if words[register] != expected[register])
+        for register in changed + [shunt]:
+            drv8305._shadow.pop(register, None) # the shadow may hold a test pattern
+        if not changed:
+            return
+        tx_words = []
+        for register in changed:
+            tx_words += [register << 11 | expected[register], _DRV8305_READ | register << 11]
+        readback = drv8305._exchange(tx_words)[1::2]
+        for register, word in zip(changed, readback):
+            if word & _DRV8305_DATA_MASK != expected[register]:
+                raise RuntimeError("DRV8305 register 0x{:02X} did not restore: wrote 0x{:03X} read 0x{:03X}".format(
+                    register, expected[register], word & _DRV8305_DATA_MASK))
+
+    def frame(self, drv8305, high_byte):
+        """Account one frame, given the first byte clocked in"""
+        self._frames += 1
+        if self.high_bits and high_byte & 0xF8:
+            self.error(drv8305)
+        if self._frames >= self.window:
+            self._frames = self._errors = 0
+
+    def error(self, drv8305):
+        """Account one bad frame, e.g. a register that read back different from what was written"""
+        self._errors += 1
+        self.frame_errors += 1
+        if self._errors > self.max_errors:
+            self.step_down(drv8305)
+
+    def step_down(self, drv8305):
+        """Drop to the next slower rate, if there is one"""
+        device = drv8305._spi
+        slower = [rate for rate in self.rates if rate < device.baudrate]
+        if slower:
+            device.baudrate = slower[-1]
+            self.step_downs += 1
+        self._frames = self._errors = 0
+
+def _field_layout(*widths):
+    """(shift, mask) of each field in a 16-bit word, given the field widths from the most significant bit down"""
+    layout = []
+    shift = 16
+    for width in widths:
+        shift -= width
+        layout.append((shift, (1 << width) - 1))
+    assert shift == 0
+    return tuple(layout)
+
+class _Register_Fields:
+    """Table-driven decode and encode shared by the register snapshots below
+
+    Each snapshot is a namedtuple with the same field names, in the same order,
+    as the matching ctypes structure, and a ``_layout`` of precomputed
+    (shift, mask) pairs, so a raw word decodes in a single pass without ctypes.
+    Where ``eval`` is available each snapshot type gets a generated
+    ``from_word`` with its layout written out (see ``_compile_decoder``).
+    """
+    __slots__ = ()
+    _layout = ()
+
+    @classmethod
+    def from_word(cls, word):
+        """Decode a 16-bit word, most significant byte first as on the wire"""
+        return cls(*[(word >> shift) & mask for shift, mask in cls._layout])
+
+    @property
+    def as_word(self):
+        """Encode the fields back into a 16-bit word, e.g. for _write_register"""
+        word = 0
+        for value, (shift, mask) in zip(self, self._layout):
+            word |= (value & mask) << shift
+        return word
+
+class DRV8305_Warning_Watchdog_Reset(_Register_Fields, namedtuple("DRV8305_Warning_Watchdog_Reset", (
+        "empty", "fault", "reserved", "temp4", "pvdd_uv", "pvdd_ov", "vds_status",
+        "vchp_uv", "temp1", "temp2", "temp3", "overtemp"))):
+    __slots__ = ()
+    _layout = _field_layout(5, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1)
+
+class DRV8305_Overcurrent(_Register_Fields, namedtuple("DRV8305_Overcurrent", (
+        "empty", "high_a", "low_a", "high_b", "low_b", "high_c", "low_c",
+        "reserved", "sense_c", "sense_b", "sense_a"))):
+    __slots__ = ()
+    _layout = _field_layout(5, 1, 1, 1, 1, 1, 1, 2, 1, 1, 1)
+
+class DRV8305_IC_Fault(_Register_Fields, namedtuple("DRV8305_IC_Fault", (
+        "empty", "pvdd_uv_2", "watchdog", "overtemp", "reserved", "vreg_uv", "avdd_uv",
+        "low_gate_supply", "reserved_2", "high_charge_pump_uv_2", "high_charge_pump_ov",
+        "high_charge_pump_ov_abs"))):
+    __slots__ = ()
+    _layout = _field_layout(5, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1)
+
+class DRV8305_VGS_Fault(_Register_Fields, namedtuple("DRV8305_VGS_Fault", (
+        "empty", "high_a", "low_a", "high_b", "low_b", "high_c", "low_c", "reserved"))):
+    __slots__ = ()
+    _layout = _field_layout(5, 1, 1, 1, 1, 1, 1, 5)
+
+class DRV8305_Gate_Control(_Register_Fields, namedtuple("DRV8305_Gate_Control", (
+        "empty", "reserved", "t_driven", "i_peak_sink", "i_peak_source"))):
+    __slots__ = ()
+    _layout = _field_layout(5, 1, 2, 4, 4)
+
+class DRV8305_Drive_Control(_Register_Fields, namedtuple("DRV8305_Drive_Control", (
+        "empty", "reserved", "active_freewheeling", "pwm_mode_msb", "pwm_mode_lsb",
+        "dead_time", "vds_sense_blanking", "vds_sense_deglitch"))):
+    __slots__ = ()
+    _layout = _field_layout(5, 1, 1, 1, 1, 3, 2, 2)
 
     @property
     def pwm_mode(self):
         return (self.pwm_mode_msb << 1) | self.pwm_mode_lsb
 
-class _IC_Operation_Control(ctypes.BigEndianStructure):
-    _fields_ = [
-                ("empty", ctypes.c_uint8, 5),
-                ("enable_OTSD", ctypes.c_uint8, 1),
-                ("disable_PVDD_UVLO2", ctypes.c_uint8, 1),
-                ("disable_GDRV_FAULT", ctypes.c_uint8, 1),
-                ("enable_SNS_CLAMP", ctypes.c_uint8, 1),
-                ("watchdog_delay", ctypes.c_uint8, 2),
-                ("disable_SNS_OCP", ctypes.c_uint8, 1),
-                ("enable_watchdog", ctypes.c_uint8, 1),
-                ("sleep", ctypes.c_uint8, 1),
-                ("clear_faults", ctypes.c_uint8, 1),
-                ("set_VCPH_UV", ctypes.c_uint8, 1),
-            ]
-
-class _Shunt_Amplifier_Control(ctypes.BigEndianStructure):
-    _fields_ = [
-                ("empty", ctypes.c_uint8, 5),
-                ("calibrate_3", ctypes.c_uint8, 1),
-                ("calibrate_2", ctypes.c_uint8, 1),
-                ("calibrate_1", ctypes.c_uint8, 1),
-                ("blanking", ctypes.c_uint8, 2),
-                ("gain_3", ctypes.c_uint8, 2),
-                ("gain_2", ctypes.c_uint8, 2),
-                ("gain_1", ctypes.c_uint8, 2),
-            ]
-
-class _Voltage_Regulator_Control(ctypes.BigEndianStructure):
-    _fields_ = [
-                ("empty", ctypes.c_uint8, 5),
-                ("reserved", ctypes.c_uint8, 1),
-                ("scaling", ctypes.c_uint8, 2),
-                ("reserved_2", ctypes.c_uint8, 3),
-                ("sleep_delay", ctypes.c_uint8, 2),
-                ("disable_undervoltage_fault", ctypes.c_uint8, 1),
-                ("undervoltage_setpoint", ctypes.c_uint8, 2),
-            ]
-
-class _Voltage_Sense_Control(ctypes.BigEndianStructure):
-    _fields_ = [
-                ("empty", ctypes.c_uint8, 5),
-                ("reserved", ctypes.c_uint8, 3),
-                ("comparator_threshold", ctypes.c_uint8, 5),
-                ("mode", ctypes.c_uint8, 3),
-            ]
-
-class _DRV8305_SPI_Word(ctypes.Union):
-    _fields_ = [
-                ("as_word", ctypes.c_uint16),
-                ("as_bytes", ctypes.c_ubyte * 2),
-                ("control", _Control),
-                ("wwr", _Warning_Watchdog_Reset_Flags),
-                ("oc", _Overcurrent_Flags),
-                ("ic_fault", _IC_Fault_Flags),
-                ("vgs", _VGS_Fault_Flags),
-                ("hs", _Gate_Control),
-                ("ls", _Gate_Control),
-                ("drive", _Drive_Control),
-                ("ic_op", _IC_Operation_Control),
-                ("shunt", _Shunt_Amplifier_Control),
-                ("vreg", _Voltage_Regulator_Control),
-                ("vsen", _Voltage_Sense_Control),
-            ]
+class DRV8305_IC_Operation(_Register_Fields, namedtuple("DRV8305_IC_Operation", (
+        "empty", "enable_OTSD", "disable_PVDD_UVLO2", "disable_GDRV_FAULT", "enable_SNS_CLAMP",
+        "watchdog_delay", "disable_SNS_OCP", "enable_watchdog", "sleep", "clear_faults",
+        "set_VCPH_UV"))):
+    __slots__ = ()
+    _layout = _field_layout(5, 1, 1, 1, 1, 2, 1, 1, 1, 1, 1)
 
-    def __len__(self):
-        return ctypes.sizeof(self)
+class DRV8305_Shunt_Amplifier(_Register_Fields, namedtuple("DRV8305_Shunt_Amplifier", (
+        "empty", "calibrate_3", "calibrate_2", "calibrate_1", "blanking", "gain_3", "gain_2",
+        "gain_1"))):
+    __slots__ = ()
+    _layout = _field_layout(5, 1, 1, 1, 2, 2, 2, 2)
 
-    def __getitem__(self, i):
-        return self.as_bytes[i]
+class DRV8305_Voltage_Regulator(_Register_Fields, namedtuple("DRV8305_Voltage_Regulator", (
+        "empty", "reserved", "scaling", "reserved_2", "sleep_delay", "disable_undervoltage_fault",
+        "undervoltage_setpoint"))):
+    __slots__ = ()
+    _layout = _field_layout(5, 1, 2, 3, 2, 1, 2)
 
-    def __setitem__(self, i, v):
-        self.as_bytes[i] = v
+class DRV8305_Voltage_Sense(_Register_Fields, namedtuple("DRV8305_Voltage_Sense", (
+        "empty", "reserved", "comparator_threshold", "mode"))):
+    __slots__ = ()
+    _layout = _field_layout(5, 3, 5, 3)
 
-    def __repr__(self):
-        return "0x{0:02X}{1:02x} (0b {0:08b} {1:08b})".format(self[0], self[1], self[0], self[1])
+class DRV8305_Reserved(_Register_Fields, namedtuple("DRV8305_Reserved", ("empty", "data"))):
+    __slots__ = ()
+    _layout = _field_layout(5, 11)
+
+_DRV8305_REGISTER_TYPES = {
+    _DRV8305_WARNING_WATCHDOG_REGISTER: DRV8305_Warning_Watchdog_Reset,
+    _DRV8305_OV_VDS_FAULT_REGISTER: DRV8305_Overcurrent,
+    _DRV8305_IC_FAULT_REGISTER: DRV8305_IC_Fault,
+    _DRV8305_VGS_FAULT_REGISTER: DRV8305_VGS_Fault,
+    _DRV8305_HS_GATE_DRIVE_CONTROL_REGISTER: DRV8305_Gate_Control,
+    _DRV8305_LS_GATE_DRIVE_CONTROL_REGISTER: DRV8305_Gate_Control,
+    _DRV8305_GATE_DRIVE_CONTROL_REGISTER: DRV8305_Drive_Control,
+    _DRV8305_RESERVED_REGISTER: DRV8305_Reserved,
+    _DRV8305_IC_OPERATION_REGISTER: DRV8305_IC_Operation,
+    _DRV8305_SHUNT_AMPLIFIER_CONTROL_REGISTER: DRV8305_Shunt_Amplifier,
+    _DRV8305_VOLTAGE_REGULATOR_CONTROL_REGISTER: DRV8305_Voltage_Regulator,
+    _DRV8305_VDS_SENSE_CONTROL_REGISTER: DRV8305_Voltage_Sense,
+}
+
+def _compile_decoder(snapshot_type):
+    # from_word with every shift and mask written out: no per-field loop, no list, no namedtuple __new__
+    terms = ["(w >> {}) & 0x{:X}".format(shift, mask) if shift else "w & 0x{:X}".format(mask)
+             for shift, mask in snapshot_type._layout]
+    return eval("lambda w: new(cls, ({},))".format(", ".join(terms)), # pylint: disable=eval-used
+                {"new": tuple.__new__, "cls": snapshot_type})
+
+for _snapshot_type in set(_DRV8305_REGISTER_TYPES.values()):
+    try:
+        _decoder = _compile_decoder(_snapshot_type)
+        if _decoder(0x5A5) == _snapshot_type.from_word(0x5A5): # else keep the table-driven loop
+            _snapshot_type.from_word = staticmethod(_decoder)
+    except (NameError, SyntaxError, TypeError): # e.g. a CircuitPython build without eval
+        pass
+
+def _decode(register, word):
+    return _DRV8305_REGISTER_TYPES[register].from_word(word)
+
+def _summarize(register, snapshot):
+    # one line for logs: the flags that are set for a status register, every field for a control register
+    name = _DRV8305_REGISTER_NAMES[register]
+    fields = [(field, value) for field, value in zip(snapshot._fields, snapshot)
+              if not (field.startswith("empty") or field.startswith("reserved"))]
+    if register in _DRV8305_STATUS_REGISTERS:
+        return "{}: {}".format(name, ", ".join(field for field, value in fields if value) or "clear")
+    return "{}: {}".format(name, " ".join("{}={}".format(field, value) for field, value in fields))
+
+class DRV8305_Snapshot_Cache:
+    """Bounded LRU of decoded snapshots and their summaries, keyed by register and raw word
+
+    The same word always gives back the same snapshot object while it stays
+    cached, so steady polling costs a dict lookup rather than a decode, and
+    unchanged snapshots compare by identity. Snapshots are immutable, so
+    sharing them is safe. The least recently used entry goes when ``size``
+    entries are held. Safe to share between threads.
+    """
+
+    def __init__(self, size=256):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self._entries = OrderedDict() # register << 16 | word -> (snapshot, summary), least recently used first
+        self._lock = Lock() if Lock is not None else _No_Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _touch(self, key):
+        # the entry at key becomes the most recently used, the caller holds the lock
+        entry = self._entries[key]
+        try:
+            self._entries.move_to_end(key)
+        except AttributeError: # CircuitPython's OrderedDict
+            del self._entries[key]
+            self._entries[key] = entry
+        return entry
+
+    def _entry(self, register, word):
+        key = register << 16 | word
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._touch(key)
+        snapshot = _decode(register, word) # outside the lock, decoding is the slow part
+        entry = (snapshot, _summarize(register, snapshot))
+        with self._lock:
+            if key in self._entries: # another thread decoded it meanwhile, keep its snapshot so identity holds
+                self.hits += 1
+                return self._touch(key)
+            self.misses += 1
+            while len(self._entries) >= self.size:
+                try:
+                    self._entries.popitem(last=False)
+                except TypeError: # CircuitPython's OrderedDict
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = entry
+        return entry
+
+    def get(self, register, word):
+        """The decoded snapshot of ``word`` read from ``register``"""
+        return self._entry(register, word)[0]
+
+    def summary(self, register, word):
+        """One line describing the snapshot, e.g. ``"oc: high_a, low_a"`` or ``"vgs: clear"``"""
+        return self._entry(register, word)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class _No_Lock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+DRV8305_SNAPSHOTS = DRV8305_Snapshot_Cache() # shared by every driver and DRV8305_Status
+
+class DRV8305_Status(namedtuple("DRV8305_Status", ("timestamp", "wwr_word", "oc_word", "ic_fault_word", "vgs_word"))):
+    """Snapshot of the fault/status registers (0x01 -- 0x04)
+
+    Holds the raw 16-bit words as clocked out of the chip (most significant
+    byte first) and a ``time.monotonic()`` timestamp; the decoded flags are
+    available under the same names as the ``_DRV8305_SPI_Word`` fields.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_buffer(cls, buf, timestamp=None):
+        """Snapshot of the 8 bytes filled in by :meth:`OtterWorks_DRV8305.readinto_status`"""
+        return cls(monotonic() if timestamp is None else timestamp, (buf[0] << 8) | buf[1],
+                   (buf[2] << 8) | buf[3], (buf[4] << 8) | buf[5], (buf[6] << 8) | buf[7])
+
+    @property
+    def wwr(self):
+        return DRV8305_SNAPSHOTS.get(_DRV8305_WARNING_WATCHDOG_REGISTER, self.wwr_word)
+
+    @property
+    def oc(self):
+        return DRV8305_SNAPSHOTS.get(_DRV8305_OV_VDS_FAULT_REGISTER, self.oc_word)
+
+    @property
+    def ic_fault(self):
+        return DRV8305_SNAPSHOTS.get(_DRV8305_IC_FAULT_REGISTER, self.ic_fault_word)
+
+    @property
+    def vgs(self):
+        return DRV8305_SNAPSHOTS.get(_DRV8305_VGS_FAULT_REGISTER, self.vgs_word)
+
+    @property
+    def summary(self):
+        """One line for logs, from the cached summaries of the four registers"""
+        if self.clear:
+            return "all clear"
+        return "; ".join(DRV8305_SNAPSHOTS.summary(register, word)
+                         for register, word in zip(_DRV8305_STATUS_REGISTERS, self[1:]) if word & _DRV8305_DATA_MASK)
+
+    @property
+    def clear(self):
+        """True when no warning or fault flag is set in any of the four registers"""
+        return not ((self.wwr_word | self.oc_word | self.ic_fault_word | self.vgs_word) & _DRV8305_DATA_MASK)
+
+def _register_number(register):
+    # accept a register address or its short name, e.g. "drive"
+    if isinstance(register, str):
+        for address, name in _DRV8305_REGISTER_NAMES.items():
+            if name == register:
+                return address
+        raise ValueError("unknown register {!r}".format(register))
+    return register
+
+class DRV8305_Configuration:
+    """Staged changes to the control registers (0x05 -- 0x0C)
+
+    Nothing touches the bus until :meth:`commit`, which works out which words
+    actually change against the shadow cache (reading any register it hasn't
+    seen, in one session), writes only those, then reads them all back in
+    the same bus session to verify. Used as a context manager it commits on a
+    clean exit.
+    """
+
+    def __init__(self, drv8305):
+        self._drv8305 = drv8305
+        self._staged = {} # register -> {field: value}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def set(self, register, **fields):
+        """Stage field values for a register, given by address or short name"""
+        register = _register_number(register)
+        if register not in _DRV8305_CONTROL_REGISTERS or register == _DRV8305_RESERVED_REGISTER:
+            raise ValueError("0x{:02X} is not a writable control register".format(register))
+        snapshot_type = _DRV8305_REGISTER_TYPES[register]
+        for field, value in fields.items():
+            if field not in snapshot_type._fields or field.startswith("empty"):
+                raise ValueError("{} has no field {!r}".format(snapshot_type.__name__, field))
+            mask = snapshot_type._layout[snapshot_type._fields.index(field)][1]
+            if not isinstance(value, int) or not 0 <= value <= mask: # as_word would mask it silently
+                raise ValueError("{}.{} = {!r} does not fit the field, 0 to {}".format(
+                    snapshot_type.__name__, field, value, mask))
+        self._staged.setdefault(register, {}).update(fields)
+        return self
+
+    def discard(self):
+        self._staged.clear()
+
+    def commit(self):
+        """Apply the staged changes; returns the list of registers that were written"""
+        staged, self._staged = self._staged, {}
+        if not staged:
+            return []
+        return self._drv8305._apply(staged)
+
+class DRV8305_Event(namedtuple("DRV8305_Event", ("timestamp", "kind", "register", "field", "value", "previous"))):
+    """A single field of a register changed between two polls"""
+    __slots__ = ()
+
+    def __str__(self):
+        name = "{}.{}".format(_DRV8305_REGISTER_NAMES[self.register], self.field)
+        if self.kind == DRV8305_CONFIG_DRIFT:
+            return "{}: {} {} -> {}".format(self.kind, name, self.previous, self.value)
+        return "{}: {}".format(self.kind, name)
+
+class DRV8305_Heartbeat(namedtuple("DRV8305_Heartbeat", ("timestamp", "polls", "events", "active"))):
+    """Periodic summary: polls and events since the last heartbeat, and the faults still active"""
+    __slots__ = ()
+    kind = DRV8305_HEARTBEAT
+
+    def __str__(self):
+        return "{}: {} polls, {} events, active faults: {}".format(self.kind, self.polls, self.events,
+            ", ".join("{}.{}".format(_DRV8305_REGISTER_NAMES[r], f) for r, f in self.active) or "none")
+
+class DRV8305_Monitor:
+    """Edge-triggered fault and configuration monitor
+
+    Each :meth:`poll` reads the status registers with
+    :meth:`OtterWorks_DRV8305.read_status` and XORs every raw word against the
+    previous poll; subscribers are only called for the fields that changed,
+    with a :class:`DRV8305_Event`. The control registers are re-read every
+    ``config_interval`` seconds and any change is reported as config drift.
+    A :class:`DRV8305_Heartbeat` goes to the subscribers every
+    ``heartbeat_interval`` seconds. Either interval can be changed, or set to
+    None to stop, at any time; the next read or heartbeat moves with it.
+    """
+
+    def __init__(self, drv8305, heartbeat_interval=60, config_interval=60):
+        self._drv8305 = drv8305
+        self._heartbeat_interval = heartbeat_interval
+        self._config_interval = config_interval
+        self._subscribers = []
+        self._status = {register: 0 for register in _DRV8305_STATUS_REGISTERS} # faults present at startup are raised on the first poll
+        self._config = None # register -> word, filled on the first poll
+        self._next_config = 0
+        self._next_heartbeat = 0
+        self._polls = 0
+        self._events = 0
+        self.active = set() # (register, field) of every fault currently set
+
+    @property
+    def config_interval(self):
+        """Seconds between reads of the control registers, or None for never"""
+        return self._config_interval
+
+    @config_interval.setter
+    def config_interval(self, interval):
+        if self._config_interval is not None and interval is not None:
+            self._next_config += interval - self._config_interval # as if it had been scheduled with the new interval
+        self._config_interval = interval
+
+    @property
+    def heartbeat_interval(self):
+        """Seconds between heartbeats, or None for none"""
+        return self._heartbeat_interval
+
+    @heartbeat_interval.setter
+    def heartbeat_interval(self, interval):
+        if self._heartbeat_interval is not None and interval is not None:
+            self._next_heartbeat += interval - self._heartbeat_interval
+        self._heartbeat_interval = interval
+
+    def subscribe(self, callback):
+        """Call ``callback(event)`` for every event and heartbeat"""
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def _emit(self, event):
+        for callback in self._subscribers:
+            callback(event)
+
+    def _diff(self, timestamp, register, previous, word, kind=None):
+        changed = (previous ^ word) & _DRV8305_DATA_MASK
+        if not changed:
+            return
+        layout = _DRV8305_REGISTER_TYPES[register]._layout
+        for field, (shift, mask) in zip(_DRV8305_REGISTER_TYPES[register]._fields, layout):
+            if not (changed >> shift) & mask or field.startswith("empty") or field.startswith("reserved"):
+                continue
+            value = (word >> shift) & mask
+            if kind is None: # status flags are all single bits
+                if value:
+                    self.active.add((register, field))
+                else:
+                    self.active.discard((register, field))
+            self._events += 1
+            self._emit(DRV8305_Event(timestamp, kind or (DRV8305_FAULT_RAISED if value else DRV8305_FAULT_CLEARED),
+                                     register, field, value, (previous >> shift) & mask))
+
+    def poll(self):
+        """Read the chip once, emit events for whatever changed and return the status snapshot"""
+        return self.update(self._drv8305.read_status())
+
+    def update(self, status):
+        """Emit events for a status snapshot that was read elsewhere, e.g. by a scheduler"""
+        now = status.timestamp
+        self._polls += 1
+        for register, word in zip(_DRV8305_STATUS_REGISTERS, status[1:]):
+            self._diff(now, register, self._status[register], word)
+            self._status[register] = word
+        if self._config_interval is not None and now >= self._next_config:
+            self._next_config = now + self._config_interval
+            config = {register: snapshot.as_word for register, snapshot in self._drv8305.refresh().items()}
+            if self._config is not None:
+                for register, word in config.items():
+                    self._diff(now, register, self._config[register], word, DRV8305_CONFIG_DRIFT)
+            self._config = config
+        if self._heartbeat_interval is not None and now >= self._next_heartbeat:
+            self._next_heartbeat = now + self._heartbeat_interval
+            self._emit(DRV8305_Heartbeat(now, self._polls, self._events, tuple(sorted(self.active))))
+            self._polls = 0
+            self._events = 0
+        return status
+
+if ctypes is not None:
+    # The original ctypes view of a frame. The driver no longer uses it, it is
+    # kept for code that still builds words with it.
+
+    class _Control(ctypes.BigEndianStructure):
+        _fields_ = [
+                    ("read", ctypes.c_uint8, 1),
+                    ("address", ctypes.c_uint8, 4),
+                    ("data", ctypes.c_uint16, 11)
+                ]
+
+    class _Warning_Watchdog_Reset_Flags(ctypes.BigEndianStructure):
+        _fields_ = [
+                    ("empty", ctypes.c_uint8, 5),
+                    ("fault", ctypes.c_uint8, 1),
+                    ("reserved", ctypes.c_uint8, 1),
+                    ("temp4", ctypes.c_uint8, 1),
+                    ("pvdd_uv", ctypes.c_uint8, 1),
+                    ("pvdd_ov", ctypes.c_uint8, 1),
+                    ("vds_status", ctypes.c_uint8, 1),
+                    ("vchp_uv", ctypes.c_uint8, 1),
+                    ("temp1", ctypes.c_uint8, 1),
+                    ("temp2", ctypes.c_uint8, 1),
+                    ("temp3", ctypes.c_uint8, 1),
+                    ("overtemp", ctypes.c_uint8, 1),
+                ]
+
+    class _Overcurrent_Flags(ctypes.BigEndianStructure):
+        _fields_ = [
+                    ("empty", ctypes.c_uint8, 5),
+                    ("high_a", ctypes.c_uint8, 1),
+                    ("low_a", ctypes.c_uint8, 1),
+                    ("high_b", ctypes.c_uint8, 1),
+                    ("low_b", ctypes.c_uint8, 1),
+                    ("high_c", ctypes.c_uint8, 1),
+                    ("low_c", ctypes.c_uint8, 1),
+                    ("reserved", ctypes.c_uint8, 2),
+                    ("sense_c", ctypes.c_uint8, 1),
+                    ("sense_b", ctypes.c_uint8, 1),
+                    ("sense_a", ctypes.c_uint8, 1),
+                ]
+
+    class _IC_Fault_Flags(ctypes.BigEndianStructure):
+        _fields_ = [
+                    ("empty", ctypes.c_uint8, 5),
+                    ("pvdd_uv_2", ctypes.c_uint8, 1),
+                    ("watchdog", ctypes.c_uint8, 1),
+                    ("overtemp", ctypes.c_uint8, 1),
+                    ("reserved", ctypes.c_uint8, 1),
+                    ("vreg_uv", ctypes.c_uint8, 1),
+                    ("avdd_uv", ctypes.c_uint8, 1),
+                    ("low_gate_supply", ctypes.c_uint8, 1),
+                    ("reserved_2", ctypes.c_uint8, 1),
+                    ("high_charge_pump_uv_2", ctypes.c_uint8, 1),
+                    ("high_charge_pump_ov", ctypes.c_uint8, 1),
+                    ("high_charge_pump_ov_abs", ctypes.c_uint8, 1),
+                ]
+
+    class _VGS_Fault_Flags(ctypes.BigEndianStructure):
+        _fields_ = [
+                    ("empty", ctypes.c_uint8, 5),
+                    ("high_a", ctypes.c_uint8, 1),
+                    ("low_a", ctypes.c_uint8, 1),
+                    ("high_b", ctypes.c_uint8, 1),
+                    ("low_b", ctypes.c_uint8, 1),
+                    ("high_c", ctypes.c_uint8, 1),
+                    ("low_c", ctypes.c_uint8, 1),
+                    ("reserved", ctypes.c_uint8, 5),
+                ]
+
+    class _Gate_Control(ctypes.BigEndianStructure):
+        _fields_ = [
+                    ("empty", ctypes.c_uint8, 5),
+                    ("reserved", ctypes.c_uint8, 1),
+                    ("t_driven", ctypes.c_uint8, 2),
+                    ("i_peak_sink", ctypes.c_uint8, 4),
+                    ("i_peak_source", ctypes.c_uint8, 4),
+                ]
+
+    class _Drive_Control(ctypes.BigEndianStructure):
+        _fields_ = [
+                    ("empty", ctypes.c_uint8, 5),
+                    ("reserved", ctypes.c_uint8, 1),
+                    ("active_freewheeling", ctypes.c_uint8, 1),
+                    ("pwm_mode_msb", ctypes.c_uint8, 1),
+                    ("pwm_mode_lsb", ctypes.c_uint8, 1),
+                    ("dead_time", ctypes.c_uint8, 3),
+                    ("vds_sense_blanking", ctypes.c_uint8, 2),
+                    ("vds_sense_deglitch", ctypes.c_uint8, 2),
+                ]
+
+        @property
+        def pwm_mode(self):
+            return (self.pwm_mode_msb << 1) | self.pwm_mode_lsb
+
+    class _IC_Operation_Control(ctypes.BigEndianStructure):
+        _fields_ = [
+                    ("empty", ctypes.c_uint8, 5),
+                    ("enable_OTSD", ctypes.c_uint8, 1),
+                    ("disable_PVDD_UVLO2", ctypes.c_uint8, 1),
+                    ("disable_GDRV_FAULT", ctypes.c_uint8, 1),
+                    ("enable_SNS_CLAMP", ctypes.c_uint8, 1),
+                    ("watchdog_delay", ctypes.c_uint8, 2),
+                    ("disable_SNS_OCP", ctypes.c_uint8, 1),
+                    ("enable_watchdog", ctypes.c_uint8, 1),
+                    ("sleep", ctypes.c_uint8, 1),
+                    ("clear_faults", ctypes.c_uint8, 1),
+                    ("set_VCPH_UV", ctypes.c_uint8, 1),
+                ]
+
+    class _Shunt_Amplifier_Control(ctypes.BigEndianStructure):
+        _fields_ = [
+                    ("empty", ctypes.c_uint8, 5),
+                    ("calibrate_3", ctypes.c_uint8, 1),
+                    ("calibrate_2", ctypes.c_uint8, 1),
+                    ("calibrate_1", ctypes.c_uint8, 1),
+                    ("blanking", ctypes.c_uint8, 2),
+                    ("gain_3", ctypes.c_uint8, 2),
+                    ("gain_2", ctypes.c_uint8, 2),
+                    ("gain_1", ctypes.c_uint8, 2),
+                ]
+
+    class _Voltage_Regulator_Control(ctypes.BigEndianStructure):
+        _fields_ = [
+                    ("empty", ctypes.c_uint8, 5),
+                    ("reserved", ctypes.c_uint8, 1),
+                    ("scaling", ctypes.c_uint8, 2),
+                    ("reserved_2", ctypes.c_uint8, 3),
+                    ("sleep_delay", ctypes.c_uint8, 2),
+                    ("disable_undervoltage_fault", ctypes.c_uint8, 1),
+                    ("undervoltage_setpoint", ctypes.c_uint8, 2),
+                ]
+
+    class _Voltage_Sense_Control(ctypes.BigEndianStructure):
+        _fields_ = [
+                    ("empty", ctypes.c_uint8, 5),
+                    ("reserved", ctypes.c_uint8, 3),
+                    ("comparator_threshold", ctypes.c_uint8, 5),
+                    ("mode", ctypes.c_uint8, 3),
+                ]
+
+    class _DRV8305_SPI_Word(ctypes.Union):
+        _fields_ = [
+                    ("as_word", ctypes.c_uint16),
+                    ("as_bytes", ctypes.c_ubyte * 2),
+                    ("control", _Control),
+                    ("wwr", _Warning_Watchdog_Reset_Flags),
+                    ("oc", _Overcurrent_Flags),
+                    ("ic_fault", _IC_Fault_Flags),
+                    ("vgs", _VGS_Fault_Flags),
+                    ("hs", _Gate_Control),
+                    ("ls", _Gate_Control),
+                    ("drive", _Drive_Control),
+                    ("ic_op", _IC_Operation_Control),
+                    ("shunt", _Shunt_Amplifier_Control),
+                    ("vreg", _Voltage_Regulator_Control),
+                    ("vsen", _Voltage_Sense_Control),
+                ]
+
+        @classmethod
+        def from_word(cls, word):
+            """Build a word from its 16-bit value, most significant byte first as on the wire"""
+            w = cls()
+            w[0] = word >> 8
+            w[1] = word & 0xFF
+            return w
+
+        def __len__(self):
+            return ctypes.sizeof(self)
+
+        def __getitem__(self, i):
+            return self.as_bytes[i]
+
+        def __setitem__(self, i, v):
+            self.as_bytes[i] = v
+
+        def __repr__(self):
+            return "0x{0:02X}{1:02x} (0b {0:08b} {1:08b})".format(self[0], self[1], self[0], self[1])
 
-assert ctypes.sizeof(_DRV8305_SPI_Word) == 2
+    assert ctypes.sizeof(_DRV8305_SPI_Word) == 2
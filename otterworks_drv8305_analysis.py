@@ -0,0 +1,182 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 M J Stanway for Otter Works LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`otterworks_drv8305_analysis` - vectorized offline analysis of DRV8305 recordings
+=========================================================================================
+
+Loads raw ``(timestamp, register, word)`` streams, e.g. from
+:class:`otterworks_drv8305_recorder.DRV8305_Recorder` files, into NumPy
+arrays, and works on whole columns at once: every field defined in
+``otterworks_drv8305`` is unpacked with one shift and mask per field, and
+fault counts, durations, rising edges and co-occurrence come from a single
+time-aligned matrix of flag states.
+
+.. code-block:: python
+
+    timestamps, registers, words = load_recording("drv8305.rec")
+    for flag, (raised, seconds, times) in fault_summary(timestamps, registers, words).items():
+        print(flag, raised, seconds)
+
+CPython only, needs NumPy (``pip install otterworks-circuitpython-drv8305[analysis]``).
+
+* Author(s): bluesquall
+"""
+try:
+    import numpy as np
+except ImportError as error:
+    raise ImportError("otterworks_drv8305_analysis needs NumPy: "
+                      "pip install otterworks-circuitpython-drv8305[analysis]") from error
+
+import otterworks_drv8305
+import otterworks_drv8305_recorder
+
+
+_RECORD = np.dtype([("ticks", "=u4"), ("register", "u1"), ("flags", "u1"), ("word", "=u2")])
+
+# every status flag, as (register, field), in register and bit order
+DRV8305_FLAGS = tuple((register, field)
+                      for register in otterworks_drv8305._DRV8305_STATUS_REGISTERS
+                      for field in otterworks_drv8305._DRV8305_REGISTER_TYPES[register]._fields
+                      if not (field.startswith("empty") or field.startswith("reserved")))
+
+
+def flag_name(flag):
+    """``"oc.high_a"`` for ``(0x02, "high_a")``"""
+    return "{}.{}".format(otterworks_drv8305._DRV8305_REGISTER_NAMES[flag[0]], flag[1])
+
+
+def load_recording(path, writes=False):
+    """Read a recorder file into ``(timestamps, registers, words)`` arrays, oldest first
+
+    Timestamps are seconds on the recorder's ``time.monotonic()`` clock, with
+    the high bits of the millisecond count put back from the flags (and, for
+    recordings made without them, the 32-bit count unwrapped). Frames that
+    were writes are left out unless ``writes`` is True.
+    """
+    header = otterworks_drv8305_recorder._HEADER
+    with open(path, "rb") as f:
+        magic, bom, record_size, capacity, head, epoch, _ = header.unpack(f.read(header.size))
+        if magic != otterworks_drv8305_recorder._MAGIC or record_size != _RECORD.itemsize:
+            raise ValueError("{} is not a DRV8305 recording".format(path))
+        if bom != otterworks_drv8305_recorder._BOM:
+            raise ValueError("{} was recorded on a host with the other byte order".format(path))
+        records = np.fromfile(f, dtype=_RECORD, count=capacity)
+    length = min(head, capacity)
+    start = (head - length) % capacity
+    records = np.concatenate((records[start:], records[:start]))[:length]
+    if not writes:
+        records = records[records["flags"] & otterworks_drv8305_recorder._FLAG_WRITE == 0]
+    ticks = records["ticks"].astype(np.int64) | (records["flags"].astype(np.int64) >> 1) << 32
+    ticks[1:] += np.cumsum(np.diff(ticks) < -(1 << 31)) << 32 # older recordings wrap every 49.7 days
+    return epoch + ticks / 1000.0, records["register"].copy(), records["word"].copy()
+
+
+def unpack(timestamps, registers, words):
+    """Unpack every field of every register present into columns
+
+    Returns ``{register: {"timestamp": array, field: array, ...}}``, with one
+    entry per record of that register. One-bit fields are boolean arrays,
+    wider ones unsigned integers.
+    """
+    timestamps = np.asarray(timestamps)
+    registers = np.asarray(registers)
+    words = np.asarray(words, dtype=np.uint16)
+    columns = {}
+    for register in np.unique(registers):
+        snapshot_type = otterworks_drv8305._DRV8305_REGISTER_TYPES.get(int(register))
+        if snapshot_type is None:
+            continue
+        selected = registers == register
+        register_words = words[selected]
+        fields = {"timestamp": timestamps[selected]}
+        for field, (shift, mask) in zip(snapshot_type._fields, snapshot_type._layout):
+            values = (register_words >> shift) & mask
+            fields[field] = values.astype(bool) if mask == 1 else values
+        columns[int(register)] = fields
+    return columns
+
+
+def flag_states(timestamps, registers, words):
+    """Time-aligned states of every status flag
+
+    Returns ``(times, states)``: ``times`` are the timestamps of the status
+    records, and ``states[i, j]`` is whether flag ``DRV8305_FLAGS[j]`` was set
+    as of record ``i``, carrying each register's last reading forward until
+    it is read again. Flags of a register not read yet count as clear.
+    """
+    timestamps = np.asarray(timestamps)
+    registers = np.asarray(registers)
+    words = np.asarray(words, dtype=np.uint16)
+    status = np.isin(registers, otterworks_drv8305._DRV8305_STATUS_REGISTERS)
+    times, registers, words = timestamps[status], registers[status], words[status]
+    index = np.arange(len(times))
+    states = np.zeros((len(times), len(DRV8305_FLAGS)), dtype=bool)
+    for register in otterworks_drv8305._DRV8305_STATUS_REGISTERS:
+        selected = registers == register
+        last = np.maximum.accumulate(np.where(selected, index, -1)) # latest record of this register, -1 before the first
+        seen = last >= 0
+        current = np.where(seen, words[np.maximum(last, 0)], 0)
+        snapshot_type = otterworks_drv8305._DRV8305_REGISTER_TYPES[register]
+        layout = dict(zip(snapshot_type._fields, snapshot_type._layout))
+        for column, (flag_register, field) in enumerate(DRV8305_FLAGS):
+            if flag_register == register:
+                shift, mask = layout[field]
+                states[:, column] = (current >> shift) & mask != 0
+    return times, states
+
+
+def _durations(times):
+    # how long each state lasted: until the next record, the last one counts as zero
+    return np.diff(times, append=times[-1:]) if len(times) else times
+
+
+def fault_summary(timestamps, registers, words):
+    """Per flag: ``(times raised, seconds set, array of rising-edge times)``
+
+    Keyed by ``(register, field)`` as in :data:`DRV8305_FLAGS`; flags that
+    were never set are left out.
+    """
+    times, states = flag_states(timestamps, registers, words)
+    rising = states.copy()
+    rising[1:] &= ~states[:-1]
+    seconds = _durations(times) @ states
+    summary = {}
+    for column in np.flatnonzero(states.any(axis=0)):
+        edges = np.flatnonzero(rising[:, column])
+        summary[DRV8305_FLAGS[column]] = (len(edges), float(seconds[column]), times[edges])
+    return summary
+
+
+def co_occurrence(timestamps, registers, words, seconds=True):
+    """Matrix over :data:`DRV8305_FLAGS` of how long every pair of flags was set together
+
+    ``seconds=False`` counts status records instead of seconds. The diagonal
+    is each flag on its own.
+    """
+    times, states = flag_states(timestamps, registers, words)
+    weights = _durations(times) if seconds else np.ones(len(times), dtype=np.int64)
+    if not len(times):
+        return np.zeros((len(DRV8305_FLAGS), len(DRV8305_FLAGS)), dtype=weights.dtype)
+    # flags change rarely: collapse runs of identical rows before the product, it keeps the matrices small
+    starts = np.flatnonzero(np.concatenate(([True], (states[1:] != states[:-1]).any(axis=1))))
+    runs = states[starts]
+    return (runs * np.add.reduceat(weights, starts)[:, None]).T @ runs
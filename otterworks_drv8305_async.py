@@ -0,0 +1,128 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 M J Stanway for Otter Works LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`otterworks_drv8305_async` - asyncio facade for the Otter Works DRV8305 driver
+=========================================================================================
+
+Runs the blocking SPI transfers of :class:`otterworks_drv8305.OtterWorks_DRV8305`
+in a dedicated single-thread executor, so a monitor can share an event loop
+with other services. CPython only.
+
+.. code-block:: python
+
+    drv = otterworks_drv8305_async.OtterWorks_DRV8305_Async(drv8305)
+    status = await drv.read_status()
+    async for status in drv.poll(0.5):
+        ...
+
+* Author(s): bluesquall
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class OtterWorks_DRV8305_Async:
+    """asyncio facade over an :class:`otterworks_drv8305.OtterWorks_DRV8305`
+
+    Every call runs on one worker thread, so transfers on the ``SPIDevice``
+    are serialized. Don't use the wrapped driver directly while the facade is
+    in use.
+    """
+
+    def __init__(self, drv8305):
+        self.drv8305 = drv8305
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="drv8305")
+        self.overruns = 0 # poll periods skipped because a read finished after its deadline
+        self.dropped = 0 # snapshots discarded because the consumer fell behind
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        """Shut the worker down once the transfer in flight finishes, without blocking the event loop"""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    def close(self):
+        """Shut the worker down, blocking until the transfer in flight finishes; not for use on the event loop"""
+        self._executor.shutdown(wait=True)
+
+    async def run(self, fn, *args):
+        """Run ``fn(*args)`` on the driver's worker thread, e.g. ``await drv.run(drv.drv8305.refresh)``"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def read_status(self):
+        return await self.run(self.drv8305.read_status)
+
+    async def refresh(self):
+        return await self.run(self.drv8305.refresh)
+
+    async def poll(self, interval, maxsize=1):
+        """Yield a status snapshot every ``interval`` seconds
+
+        Reads are scheduled against absolute deadlines, so the period doesn't
+        drift with read latency; if a read overruns, the missed periods are
+        skipped rather than made up in a burst. Snapshots wait in a queue of
+        ``maxsize``; when the consumer is slower than the poll rate the oldest
+        is dropped, so with the default of 1 it always gets the latest state.
+        Closing or cancelling the consumer stops polling.
+        """
+        queue = asyncio.Queue(maxsize)
+        producer = asyncio.ensure_future(self._produce(queue, interval))
+        try:
+            while True:
+                item = await queue.get()
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+
+    async def _produce(self, queue, interval):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            try:
+                snapshot = await self.read_status()
+            except Exception as e: # pylint: disable=broad-except
+                self._offer(queue, e) # re-raised in the consumer
+                return
+            self._offer(queue, snapshot)
+            deadline += interval
+            now = loop.time()
+            if deadline < now:
+                missed = int((now - deadline) // interval) + 1
+                self.overruns += missed
+                deadline += missed * interval
+            await asyncio.sleep(deadline - now)
+
+    def _offer(self, queue, item):
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(item)
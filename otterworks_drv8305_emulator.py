@@ -0,0 +1,229 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 M J Stanway for Otter Works LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`otterworks_drv8305_emulator` - in-process DRV8305 for tests and benchmarks
+=========================================================================================
+
+A register-level model of the DRV8305 that stands in for
+``adafruit_bus_device.spi_device.SPIDevice``, so
+:class:`otterworks_drv8305.OtterWorks_DRV8305` can be exercised on any
+machine:
+
+.. code-block:: python
+
+    chip = otterworks_drv8305_emulator.DRV8305_Emulator()
+    drv8305 = otterworks_drv8305.OtterWorks_DRV8305(chip, None)
+    chip.inject("wwr", "overtemp")
+
+The emulator also exposes ``spi`` and ``chip_select`` objects that behave like
+``busio.SPI`` and ``digitalio.DigitalInOut``, so it can be driven through a
+real ``SPIDevice`` too, and several emulators can share one bus.
+
+Modelled behaviour:
+
+* 16-bit frames, MSB first: R/W, 4 address bits, 11 data bits. The response
+  carries the addressed register's contents (before the write, for writes).
+* Control registers 0x05 -- 0x0C power up with their datasheet defaults.
+  Writes to the status registers and to 0x08 are ignored. CLR_FLTS
+  self-clears.
+* Warnings in 0x01 follow the injected conditions. Faults in 0x02 -- 0x04
+  latch until CLR_FLTS is written with the condition gone, and set the FAULT
+  bit in 0x01. ``nfault`` counts falling edges of the nFAULT output.
+* With EN_WD set, the watchdog must be serviced by reading 0x01 within the
+  WD_DLY window, or the watchdog fault latches.
+* ``latency`` adds seconds per frame. ``error_rate`` flips a random
+  response bit in that fraction of frames.
+* Above ``max_baudrate`` the wiring is marginal: ``marginal_error_rate`` of
+  the frames get a random response bit flipped, and a random bit of the
+  frame they clock in, so a write can land in another register or turn into
+  a read.
+
+CPython only.
+
+* Author(s): bluesquall
+"""
+import random
+import threading
+from time import monotonic, sleep
+
+import otterworks_drv8305
+
+
+DRV8305_DEFAULTS = dict(otterworks_drv8305._DRV8305_RESET_WORDS)
+
+_FAULT_BIT = 1 << 10 # FAULT in register 0x01
+_WATCHDOG_BIT = 1 << 9 # WD_FAULT in register 0x03
+_WATCHDOG_DELAYS = (0.010, 0.020, 0.050, 0.100) # seconds, by WD_DLY
+
+
+class _Emulated_Bus:
+    """Stands in for busio.SPI; frames go to whichever emulator has chip select low"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.devices = []
+        self.baudrate = None
+        self.polarity = None
+        self.phase = None
+        self.locks = 0
+        self.configures = 0
+        self.frames = 0
+
+    def try_lock(self):
+        if self._lock.acquire(False):
+            self.locks += 1
+            return True
+        return False
+
+    def unlock(self):
+        self._lock.release()
+
+    def configure(self, baudrate=100000, polarity=0, phase=0, bits=8):
+        self.baudrate = baudrate
+        self.polarity = polarity
+        self.phase = phase
+        self.configures += 1
+
+    def write_readinto(self, buffer_out, buffer_in, out_start=0, out_end=None, in_start=0, in_end=None):
+        if out_end is None:
+            out_end = len(buffer_out)
+        if in_end is None:
+            in_end = len(buffer_in)
+        for offset in range(0, out_end - out_start, 2):
+            word = (buffer_out[out_start + offset] << 8) | buffer_out[out_start + offset + 1]
+            response = 0xFFFF # MISO floats high when nothing drives it
+            for device in self.devices:
+                if not device.chip_select.value:
+                    response = device._frame(word)
+            self.frames += 1
+            if in_start + offset + 1 < in_end:
+                buffer_in[in_start + offset] = response >> 8
+                buffer_in[in_start + offset + 1] = response & 0xFF
+
+
+class _Emulated_Pin:
+    """Stands in for digitalio.DigitalInOut on the chip select line"""
+
+    def __init__(self):
+        self.value = True
+
+    def switch_to_output(self, value=True, drive_mode=None):
+        self.value = value
+
+
+class DRV8305_Emulator:
+    """Register-level DRV8305 model, usable wherever the driver expects an SPIDevice"""
+
+    def __init__(self, bus=None, latency=0.0, error_rate=0.0, seed=None, max_baudrate=None, marginal_error_rate=0.25):
+        self.spi = bus if bus is not None else _Emulated_Bus()
+        self.spi.devices.append(self)
+        self.chip_select = _Emulated_Pin()
+        self.baudrate = 1000000
+        self.polarity = 0
+        self.phase = 1
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_baudrate = max_baudrate
+        self.marginal_error_rate = marginal_error_rate
+        self.nfault = otterworks_drv8305.DRV8305_Edge_Counter()
+        self._random = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        """Power-on reset: control registers back to defaults, no faults"""
+        self.registers = [0] * 16
+        for register, word in DRV8305_DEFAULTS.items():
+            self.registers[register] = word
+        self.conditions = [0] * 16 # injected conditions, status registers only
+        self._watchdog_serviced = monotonic()
+
+    # SPIDevice protocol
+
+    def __enter__(self):
+        while not self.spi.try_lock():
+            sleep(0)
+        self.spi.configure(baudrate=self.baudrate, polarity=self.polarity, phase=self.phase)
+        self.chip_select.value = False
+        return self.spi
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.chip_select.value = True
+        self.spi.unlock()
+        return False
+
+    # fault injection
+
+    def inject(self, register, field, value=1):
+        """Set (or with value=0 remove) a condition, e.g. ``inject("wwr", "overtemp")``"""
+        register = otterworks_drv8305._register_number(register)
+        snapshot_type = otterworks_drv8305._DRV8305_REGISTER_TYPES[register]
+        shift, mask = snapshot_type._layout[snapshot_type._fields.index(field)]
+        self.conditions[register] = (self.conditions[register] & ~(mask << shift)) | ((value & mask) << shift)
+        self._update_status()
+
+    def clear(self, register, field):
+        self.inject(register, field, 0)
+
+    def _update_status(self):
+        faulted = self.registers[0x01] & _FAULT_BIT
+        for register in (0x02, 0x03, 0x04):
+            self.registers[register] |= self.conditions[register] # faults latch
+        fault = (self.conditions[0x01] & _FAULT_BIT
+                 or self.registers[0x02] or self.registers[0x03] or self.registers[0x04])
+        self.registers[0x01] = (self.conditions[0x01] & ~_FAULT_BIT) | (_FAULT_BIT if fault else 0)
+        if fault and not faulted:
+            self.nfault.fall()
+
+    def _check_watchdog(self, now):
+        ic_op = self.registers[0x09]
+        if ic_op & (1 << 3): # EN_WD
+            if now - self._watchdog_serviced > _WATCHDOG_DELAYS[(ic_op >> 5) & 0x3]:
+                self.registers[0x03] |= _WATCHDOG_BIT
+                self._update_status()
+
+    def _frame(self, word):
+        if self.latency:
+            sleep(self.latency)
+        now = monotonic()
+        self._check_watchdog(now)
+        marginal = (self.max_baudrate is not None and self.spi.baudrate > self.max_baudrate
+                    and self._random.random() < self.marginal_error_rate)
+        if marginal:
+            word ^= 1 << self._random.randrange(16)
+        register = (word >> 11) & 0xF
+        response = self.registers[register] & otterworks_drv8305._DRV8305_DATA_MASK
+        if word & 0x8000:
+            if register == 0x01:
+                self._watchdog_serviced = now
+        elif register in DRV8305_DEFAULTS and register != 0x08:
+            data = word & otterworks_drv8305._DRV8305_DATA_MASK
+            if register == 0x09 and data & (1 << 1): # CLR_FLTS
+                data &= ~(1 << 1)
+                for status in (0x02, 0x03, 0x04):
+                    self.registers[status] = 0
+                self._update_status()
+            if register == 0x09 and data & (1 << 3) and not self.registers[0x09] & (1 << 3):
+                self._watchdog_serviced = now # the window starts when the watchdog is enabled
+            self.registers[register] = data
+        if marginal or self.error_rate and self._random.random() < self.error_rate:
+            response ^= 1 << self._random.randrange(16)
+        return response
@@ -0,0 +1,201 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 M J Stanway for Otter Works LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`otterworks_drv8305_flight` - fault flight recorder for the DRV8305
+=========================================================================================
+
+Samples the four status registers (0x01 -- 0x04) at a high rate into a
+fixed ring in memory. When the trigger flags go from clear to set, sampling
+carries on for the post-trigger window, then the whole ring is written to
+disk in a single ``write`` and the recorder re-arms.
+
+The ring lives inside the dump image, so a dump needs no copying and memory
+use never changes. File layout, native byte order::
+
+    header, 48 bytes:
+        8s  magic b"DRV8305F"
+        H   byte order mark 0xFEFF
+        H   trigger mask over the 0x01 word
+        I   capacity, in samples
+        I   number of valid samples
+        I   slot of the oldest sample
+        I   slot of the trigger sample
+        I   dumps written before this one
+        d   time.monotonic() of the trigger sample
+        d   time.time() when the dump was written
+    capacity x d   time.monotonic() of each sample
+    capacity x 8s  words of registers 0x01 -- 0x04, most significant byte first
+
+CPython only.
+
+* Author(s): bluesquall
+"""
+import struct
+import threading
+from time import monotonic, sleep, time
+
+import otterworks_drv8305
+
+
+_HEADER = struct.Struct("=8sHHIIIIIdd")
+_MAGIC = b"DRV8305F"
+_BOM = 0xFEFF
+_FAULT = 0x0400 # FAULT in the warning and watchdog reset register, set while any fault is latched
+
+
+class DRV8305_Flight_Recorder:
+    """Pre-trigger ring of status samples, dumped to disk when a fault is raised
+
+    Samples ``rate`` times a second from a thread once started. The ring
+    holds ``pre`` samples before the trigger, the trigger sample and ``post``
+    samples after it. The trigger is a rising edge of any bit of ``mask`` in
+    the 0x01 word; the default is FAULT, and 0x07FF also catches warnings.
+    Dumps go to ``path.format(n)`` for the n-th dump, e.g.
+    ``"/var/log/drv8305/fault-{:04d}.bin"``.
+    """
+
+    def __init__(self, drv8305, path, rate=1000.0, pre=2000, post=500, mask=_FAULT):
+        if not 0 < mask <= otterworks_drv8305._DRV8305_DATA_MASK:
+            raise ValueError("mask must select bits of the 11-bit register contents")
+        self._drv8305 = drv8305
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity = pre + 1 + post
+        self._post = post
+        self._mask = mask
+        self._mask_hi = mask >> 8
+        self._mask_lo = mask & 0xFF
+        self._image = bytearray(_HEADER.size + 16 * capacity)
+        view = memoryview(self._image)
+        self._times = view[_HEADER.size:_HEADER.size + 8 * capacity].cast("d")
+        words = _HEADER.size + 8 * capacity
+        self._slots = tuple(view[words + 8 * i:words + 8 * i + 8] for i in range(capacity)) # sliced once, not per sample
+        self._next = 0 # slot the next sample goes into
+        self._count = 0
+        self._high = False # trigger flags set in the previous sample
+        self._trigger = None # slot of the trigger sample while the post-trigger window fills
+        self._remaining = 0
+        self.dumps = 0
+        self.overruns = 0 # samples that started late by more than one period
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """Read the status registers once into the ring; dumps when the post-trigger window is full"""
+        i = self._next
+        slot = self._slots[i]
+        self._drv8305.readinto_status(slot)
+        self._times[i] = monotonic()
+        self._next = i + 1 if i + 1 < self.capacity else 0
+        if self._count < self.capacity:
+            self._count += 1
+        high = bool(slot[0] & self._mask_hi or slot[1] & self._mask_lo)
+        if self._trigger is None:
+            if high and not self._high:
+                self._trigger = i
+                self._remaining = self._post
+        elif self._remaining:
+            self._remaining -= 1
+        self._high = high
+        if self._trigger is not None and not self._remaining:
+            self.dump()
+
+    def dump(self):
+        """Write the ring to the next dump file in one write and re-arm; returns the path"""
+        trigger = self._next - 1 if self._trigger is None else self._trigger # forced dump: the latest sample
+        trigger %= self.capacity
+        oldest = (self._next - self._count) % self.capacity
+        _HEADER.pack_into(self._image, 0, _MAGIC, _BOM, self._mask, self.capacity, self._count,
+                          oldest, trigger, self.dumps, self._times[trigger], time())
+        path = self.path.format(self.dumps)
+        with open(path, "wb") as f:
+            f.write(self._image)
+        self.dumps += 1
+        self._trigger = None
+        self._count = 0 # the next dump only holds samples taken after this one
+        return path
+
+    def run(self, duration=None):
+        """Sample at ``rate`` against absolute deadlines, for ``duration`` seconds or until stopped"""
+        period = 1.0 / self.rate
+        deadline = monotonic()
+        end = None if duration is None else deadline + duration
+        while not self._stop.is_set() and (end is None or deadline < end):
+            delay = deadline - monotonic()
+            if delay > 0:
+                sleep(delay)
+            elif delay < -period:
+                self.overruns += 1
+                deadline = monotonic() # fell behind, realign rather than sample in a burst
+            self.sample()
+            deadline += period
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="drv8305-flight", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class DRV8305_Flight_Dump:
+    """A dump file written by :class:`DRV8305_Flight_Recorder`
+
+    ``statuses`` holds the samples as :class:`otterworks_drv8305.DRV8305_Status`,
+    oldest first, and ``trigger_index`` is the position of the trigger sample
+    in that list.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            image = f.read()
+        (magic, bom, self.mask, capacity, count, oldest, trigger, self.number,
+         self.trigger_time, self.wall_time) = _HEADER.unpack_from(image)
+        if magic != _MAGIC:
+            raise ValueError("{} is not a DRV8305 flight recorder dump".format(path))
+        if bom != _BOM:
+            raise ValueError("{} was written on a host with the other byte order".format(path))
+        times = memoryview(image)[_HEADER.size:_HEADER.size + 8 * capacity].cast("d")
+        words = _HEADER.size + 8 * capacity
+        order = [(oldest + n) % capacity for n in range(count)]
+        self.statuses = [otterworks_drv8305.DRV8305_Status.from_buffer(image[words + 8 * i:words + 8 * i + 8], times[i])
+                         for i in order]
+        self.trigger_index = order.index(trigger) if trigger in order else None
+
+    @property
+    def pre_trigger(self):
+        return self.statuses[:self.trigger_index]
+
+    @property
+    def post_trigger(self):
+        return [] if self.trigger_index is None else self.statuses[self.trigger_index + 1:]
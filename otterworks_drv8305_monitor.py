@@ -0,0 +1,251 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 M J Stanway for Otter Works LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`otterworks_drv8305_monitor` - DRV8305 fault monitor service for the BeagleBone Black
+=========================================================================================
+
+The ``drv8305-monitor`` console script: what the
+``examples/drv8305_monitor_on_bbblack_*.py`` scripts do, packaged to start
+fast and run under systemd.
+
+* The pinmux is read from sysfs, and ``config-pin`` is only run for the pins
+  that are not already in SPI mode.
+* Blinka and the driver are only imported once the arguments are parsed.
+* SIGHUP (``systemctl reload``) re-reads the configuration file, reopens the
+  log (so it also works after logrotate) and applies the new polling
+  intervals, all in-process: the SPI device, the driver's shadow cache and
+  the monitor's fault state carry on untouched. Changing ``bus`` needs a
+  restart.
+
+The configuration file is TOML (Python 3.11 or later) or JSON, every key is
+optional:
+
+.. code-block:: toml
+
+    bus = "spi0" # or "spi1"
+
+    [logging]
+    file = "drv8305monitor.log" # "" logs to stderr
+    level = "DEBUG"
+    max_bytes = 10000000
+    backup_count = 13
+
+    [polling]
+    interval = 3.0 # seconds
+    heartbeat_interval = 60
+    config_interval = 60
+
+CPython on Linux only.
+
+* Author(s): bluesquall
+"""
+import argparse
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+import signal
+import subprocess
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+
+# pin -> mode for each bus, and the chip select pin, as wired in the examples
+_PINS = {
+    "spi0": (("P9_17", "spi_cs"), ("P9_18", "spi"), ("P9_21", "spi"), ("P9_22", "spi_sclk")),
+    "spi1": (("P9_28", "spi_cs"), ("P9_29", "spi"), ("P9_30", "spi"), ("P9_31", "spi_sclk")),
+}
+_PINMUX_STATE = "/sys/devices/platform/ocp/ocp:{}_pinmux/state" # what config-pin reads and writes
+
+_DEFAULTS = {
+    "bus": "spi0",
+    "logging": {"file": "drv8305monitor.log", "level": "DEBUG", "max_bytes": 10000000, "backup_count": 13},
+    "polling": {"interval": 3.0, "heartbeat_interval": 60, "config_interval": 60},
+}
+
+_FORMAT = "%(asctime)s\t%(levelname)s\t%(message)s"
+_DATE_FORMAT = "%Y-%m-%d %H:%M:%S %z"
+
+
+def load_config(path=None):
+    """The defaults, overridden by whatever the file at ``path`` sets"""
+    config = {section: dict(values) if isinstance(values, dict) else values for section, values in _DEFAULTS.items()}
+    if path is None:
+        return config
+    with open(path, "rb") as f:
+        source = f.read()
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise RuntimeError("TOML configuration needs Python 3.11 or later, use JSON")
+        overrides = tomllib.loads(source.decode())
+    else:
+        overrides = json.loads(source)
+    for section, values in overrides.items():
+        if section not in config:
+            raise ValueError("unknown configuration section {!r}".format(section))
+        if isinstance(config[section], dict):
+            if not isinstance(values, dict):
+                raise ValueError("{} must be a table of settings".format(section))
+            unknown = set(values) - set(config[section])
+            if unknown:
+                raise ValueError("unknown {} settings: {}".format(section, ", ".join(sorted(unknown))))
+            config[section].update(values)
+        else:
+            config[section] = values
+    _validate(config)
+    return config
+
+
+def _number(section, key, value, optional=False):
+    if value is None and optional:
+        return
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not value > 0:
+        raise ValueError("{}.{} must be a positive number of seconds, not {!r}".format(section, key, value))
+
+
+def _validate(config):
+    # everything that could fail later, checked before any of it is applied
+    if config["bus"] not in _PINS and config["bus"] != "emulated":
+        raise ValueError("bus must be one of {}".format(", ".join(sorted(_PINS) + ["emulated"])))
+    settings = config["logging"]
+    if not isinstance(settings["file"], str):
+        raise ValueError("logging.file must be a path, or \"\" for stderr")
+    level = settings["level"]
+    if isinstance(level, bool) or not isinstance(level, (int, str)) or not isinstance(
+            logging.getLevelName(level.upper()) if isinstance(level, str) else level, int):
+        raise ValueError("logging.level {!r} is not a logging level".format(level))
+    for key in ("max_bytes", "backup_count"):
+        value = settings[key]
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise ValueError("logging.{} must be a whole number, not {!r}".format(key, value))
+    settings = config["polling"]
+    _number("polling", "interval", settings["interval"])
+    _number("polling", "heartbeat_interval", settings["heartbeat_interval"], optional=True)
+    _number("polling", "config_interval", settings["config_interval"], optional=True)
+
+
+def configure_logging(settings):
+    """Replace the root logger's handlers, closing the old ones so the log file is reopened
+
+    The new handler is opened first, so if that fails the old ones stay.
+    """
+    level = settings["level"]
+    if settings["file"]:
+        handler = RotatingFileHandler(settings["file"], maxBytes=settings["max_bytes"],
+                                      backupCount=settings["backup_count"])
+    else:
+        handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(_FORMAT, _DATE_FORMAT))
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+        old.close()
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def configure_pins(bus):
+    """Put the bus pins in SPI mode, running config-pin only for those that aren't"""
+    for pin, mode in _PINS[bus]:
+        try:
+            with open(_PINMUX_STATE.format(pin)) as f:
+                if f.read().strip() == mode:
+                    continue
+        except OSError: # no universal cape overlay, leave it to config-pin
+            pass
+        logging.info("config-pin %s %s", pin, mode)
+        subprocess.run(["config-pin", pin, mode], check=True)
+
+
+def _open_drv8305(bus):
+    # deferred: importing Blinka takes a while on the BeagleBone
+    # pylint: disable=import-outside-toplevel
+    import otterworks_drv8305
+    if bus == "emulated": # for trying the service out off the board
+        import otterworks_drv8305_emulator
+        return otterworks_drv8305.OtterWorks_DRV8305(otterworks_drv8305_emulator.DRV8305_Emulator(), None)
+    import board
+    import busio
+    import digitalio
+    if bus == "spi0":
+        spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
+        cs = digitalio.DigitalInOut(board.P9_17)
+    else:
+        spi = busio.SPI(board.SCK_1, board.MISO_1, board.MOSI_1) # as in examples/drv8305_monitor_on_bbblack_spi1.py
+        cs = digitalio.DigitalInOut(board.P9_28)
+    return otterworks_drv8305.OtterWorks_DRV8305(spi, cs)
+
+
+def _apply_polling(monitor, settings):
+    monitor.heartbeat_interval = settings["heartbeat_interval"]
+    monitor.config_interval = settings["config_interval"]
+    return settings["interval"]
+
+
+def main(argv=None):
+    # SIGHUP stays pending until the main loop picks it up: a reload during startup, or mid-transaction, must not kill us
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGHUP})
+    parser = argparse.ArgumentParser(prog="drv8305-monitor", description="Log DRV8305 faults, warnings and configuration drift")
+    parser.add_argument("-c", "--config", help="TOML or JSON configuration file, re-read on SIGHUP")
+    parser.add_argument("--bus", choices=sorted(_PINS) + ["emulated"], help="overrides the configuration file")
+    args = parser.parse_args(argv)
+    config = load_config(args.config)
+    bus = args.bus or config["bus"]
+    configure_logging(config["logging"])
+    if bus in _PINS:
+        configure_pins(bus)
+
+    import otterworks_drv8305 # pylint: disable=import-outside-toplevel
+    levels = {
+        otterworks_drv8305.DRV8305_FAULT_RAISED: logging.CRITICAL,
+        otterworks_drv8305.DRV8305_FAULT_CLEARED: logging.WARNING,
+        otterworks_drv8305.DRV8305_CONFIG_DRIFT: logging.WARNING,
+        otterworks_drv8305.DRV8305_HEARTBEAT: logging.INFO,
+    }
+    monitor = otterworks_drv8305.DRV8305_Monitor(_open_drv8305(bus))
+    interval = _apply_polling(monitor, config["polling"])
+
+    @monitor.subscribe
+    def log_event(event):
+        logging.log(levels[event.kind], str(event))
+
+    logging.info("monitoring DRV8305 on %s every %s s", bus, interval)
+    while True:
+        monitor.poll() # only logs transitions, plus a heartbeat
+        if signal.sigtimedwait({signal.SIGHUP}, interval) is None:
+            continue
+        try:
+            config = load_config(args.config) # validates everything applied below
+            configure_logging(config["logging"])
+        except (OSError, ValueError, RuntimeError) as error:
+            logging.error("reload failed, keeping the current configuration: %s", error)
+            continue
+        interval = _apply_polling(monitor, config["polling"])
+        if not args.bus and config["bus"] != bus:
+            logging.warning("bus changed to %s, restart to switch from %s", config["bus"], bus)
+        logging.info("reloaded, polling every %s s", interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 M J Stanway for Otter Works LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`otterworks_drv8305_profile` - declarative DRV8305 configuration profiles
+=========================================================================================
+
+A profile names the control register settings in engineering units, in TOML
+or JSON, one table per register (short names as in the driver):
+
+.. code-block:: toml
+
+    name = "bench supply, 24 V"
+
+    [hs]
+    drive_time_ns = 1780
+    sink_current_ma = 60
+    source_current_ma = 50
+
+    [drive]
+    dead_time_ns = 440
+    pwm_mode = 3 # inputs
+
+    [shunt]
+    gain = 40 # V/V, all three channels; or gain_1, gain_2, gain_3
+
+    [vsen]
+    vds_threshold_v = 0.730
+    vds_mode = "latched"
+
+Values must be one of the settings the chip supports, e.g. a dead time of
+35, 52, 88, 440, 880, 1760, 3520 or 5280 ns. Any other key that is a field
+name of the register snapshot is taken as the raw field code; ``gain_1`` --
+``gain_3`` are field names too, but the keys above take precedence, so they
+are always in V/V. Everything a profile
+leaves out keeps its power-on value, so a profile compiles to the complete
+image of the eight control words (0x05 -- 0x0C) once, when it is loaded;
+applying it is then a single bus session, and checking for drift a single
+comparison against the words read back.
+
+CPython only; TOML needs Python 3.11 or later (``tomllib``).
+
+* Author(s): bluesquall
+"""
+from collections import namedtuple
+import json
+import zlib
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+import otterworks_drv8305
+
+
+# settings the chip supports, indexed by field code
+_DRIVE_TIME_NS = (220, 440, 880, 1780)
+_SINK_CURRENT_MA = (20, 30, 40, 50, 60, 70, 80, 250, 500, 750, 1000, 1250)
+_SOURCE_CURRENT_MA = (10, 20, 30, 40, 50, 60, 70, 125, 250, 500, 750, 1000)
+_DEAD_TIME_NS = (35, 52, 88, 440, 880, 1760, 3520, 5280)
+_VDS_BLANKING_US = (0, 1.75, 3.5, 7)
+_VDS_DEGLITCH_US = (0, 1.75, 3.5, 7)
+_PWM_INPUTS = (6, 3, 1)
+_WATCHDOG_MS = (10, 20, 50, 100)
+_GAIN = (10, 20, 40, 80) # V/V
+_CS_BLANKING_US = (0, 0.5, 2.5, 10)
+_VREF_SCALE = (None, 2, 4)
+_SLEEP_DELAY_US = (0, 10, 50, 1000)
+_UNDERVOLTAGE_FRACTION = (0.9, 0.8, 0.7) # of VREG
+_VDS_THRESHOLD_V = (0.060, 0.068, 0.076, 0.086, 0.097, 0.109, 0.123, 0.138,
+                    0.155, 0.175, 0.197, 0.222, 0.250, 0.282, 0.317, 0.358,
+                    0.403, 0.454, 0.511, 0.576, 0.648, 0.730, 0.822, 0.926,
+                    1.043, 1.175, 1.324, 1.491, 1.679, 1.892, 2.131, 2.400)
+_VDS_MODES = ("latched", "report", "disabled")
+
+_GATE_KEYS = {
+    "drive_time_ns": (("t_driven",), _DRIVE_TIME_NS),
+    "sink_current_ma": (("i_peak_sink",), _SINK_CURRENT_MA),
+    "source_current_ma": (("i_peak_source",), _SOURCE_CURRENT_MA),
+}
+
+# register -> profile key -> (fields it sets, supported settings by code)
+_PROFILE_KEYS = {
+    0x05: _GATE_KEYS,
+    0x06: _GATE_KEYS,
+    0x07: {
+        "dead_time_ns": (("dead_time",), _DEAD_TIME_NS),
+        "vds_blanking_us": (("vds_sense_blanking",), _VDS_BLANKING_US),
+        "vds_deglitch_us": (("vds_sense_deglitch",), _VDS_DEGLITCH_US),
+        "pwm_mode": (("pwm_mode_msb", "pwm_mode_lsb"), _PWM_INPUTS), # a 2-bit code split over two fields
+    },
+    0x09: {
+        "watchdog_ms": (("watchdog_delay",), _WATCHDOG_MS),
+    },
+    0x0A: {
+        "gain": (("gain_1", "gain_2", "gain_3"), _GAIN),
+        "gain_1": (("gain_1",), _GAIN),
+        "gain_2": (("gain_2",), _GAIN),
+        "gain_3": (("gain_3",), _GAIN),
+        "blanking_us": (("blanking",), _CS_BLANKING_US),
+    },
+    0x0B: {
+        "vref_scale": (("scaling",), _VREF_SCALE),
+        "sleep_delay_us": (("sleep_delay",), _SLEEP_DELAY_US),
+        "undervoltage_fraction": (("undervoltage_setpoint",), _UNDERVOLTAGE_FRACTION),
+    },
+    0x0C: {
+        "vds_threshold_v": (("comparator_threshold",), _VDS_THRESHOLD_V),
+        "vds_mode": (("mode",), _VDS_MODES),
+    },
+}
+
+_METADATA = ("name", "description")
+
+_cache = {} # crc32 of a profile's source -> compiled DRV8305_Profile
+
+
+def _code(key, value, settings):
+    # field code of a value in engineering units; numbers match to within 0.5 %
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError("{} = {!r} is not a number or a name".format(key, value))
+    for code, setting in enumerate(settings):
+        if setting is None:
+            continue
+        if isinstance(setting, str) or isinstance(value, str):
+            if value == setting:
+                return code
+        elif abs(value - setting) <= 0.005 * abs(setting) or value == setting:
+            return code
+    raise ValueError("{} = {!r} is not supported, use one of {}".format(
+        key, value, ", ".join(str(setting) for setting in settings if setting is not None)))
+
+
+def _compile_register(register, settings):
+    snapshot_type = otterworks_drv8305._DRV8305_REGISTER_TYPES[register]
+    keys = _PROFILE_KEYS.get(register, {})
+    fields = {}
+    for key, value in settings.items():
+        if key in keys:
+            names, table = keys[key]
+            code = _code(key, value, table)
+            if names == ("pwm_mode_msb", "pwm_mode_lsb"):
+                fields.update(pwm_mode_msb=code >> 1, pwm_mode_lsb=code & 1)
+            else:
+                fields.update((name, code) for name in names)
+        elif key in snapshot_type._fields and not key.startswith("empty"):
+            mask = snapshot_type._layout[snapshot_type._fields.index(key)][1]
+            if (isinstance(value, bool) or not isinstance(value, (int, float))
+                    or isinstance(value, float) and not value.is_integer() or not 0 <= value <= mask):
+                raise ValueError("{} = {!r} does not fit the {}-bit field".format(key, value, mask.bit_length()))
+            fields[key] = int(value)
+        else:
+            raise ValueError("unknown setting {!r} for register {}".format(
+                key, otterworks_drv8305._DRV8305_REGISTER_NAMES[register]))
+    return snapshot_type.from_word(otterworks_drv8305._DRV8305_RESET_WORDS[register])._replace(**fields).as_word
+
+
+class DRV8305_Profile(namedtuple("DRV8305_Profile", ("name", "words", "checksum"))):
+    """A compiled profile: the eight control words for 0x05 -- 0x0C and their CRC-32"""
+    __slots__ = ()
+
+    @property
+    def expected(self):
+        """The words as they read back, without the self-clearing bits"""
+        return tuple(word & ~otterworks_drv8305._DRV8305_SELF_CLEARING.get(register, 0)
+                     for register, word in zip(otterworks_drv8305._DRV8305_CONTROL_REGISTERS, self.words))
+
+    @property
+    def config(self):
+        """register -> decoded snapshot, for reading the compiled image"""
+        return {register: otterworks_drv8305._decode(register, word)
+                for register, word in zip(otterworks_drv8305._DRV8305_CONTROL_REGISTERS, self.words)}
+
+    def apply(self, drv8305):
+        """Write the image and read it back, all in one bus session; RuntimeError if it doesn't verify"""
+        reserved = otterworks_drv8305._DRV8305_RESERVED_REGISTER
+        registers = otterworks_drv8305._DRV8305_CONTROL_REGISTERS
+        tx_words = [register << 11 | word for register, word in zip(registers, self.words) if register != reserved]
+        tx_words += [otterworks_drv8305._DRV8305_READ | register << 11 for register in registers]
+        readback = tuple(word & otterworks_drv8305._DRV8305_DATA_MASK
+                         for word in drv8305._exchange(tx_words)[-len(registers):])
+        if drv8305._cache_policy != otterworks_drv8305._DRV8305_CACHE_ALWAYS_READ:
+            for register, word in zip(registers, readback):
+                drv8305._store_shadow(register, word)
+        if readback != self.expected:
+            raise RuntimeError("DRV8305 profile {!r} did not verify, drifted: {}".format(
+                self.name, self._describe(readback)))
+
+    def drift(self, drv8305):
+        """Read the control registers in one session; returns the registers that differ from the image"""
+        registers = otterworks_drv8305._DRV8305_CONTROL_REGISTERS
+        readback = tuple(word & otterworks_drv8305._DRV8305_DATA_MASK
+                         for word in drv8305._exchange([otterworks_drv8305._DRV8305_READ | register << 11
+                                                        for register in registers]))
+        if readback == self.expected:
+            return []
+        return [register for register, word, expected in zip(registers, readback, self.expected) if word != expected]
+
+    def _describe(self, readback):
+        return ", ".join("0x{:02X} expected 0x{:03X} read 0x{:03X}".format(register, expected, word)
+                         for register, word, expected in zip(otterworks_drv8305._DRV8305_CONTROL_REGISTERS,
+                                                             readback, self.expected) if word != expected)
+
+
+def compile_profile(profile, name=None):
+    """Validate a profile, as a dict of register tables, and compile it to a :class:`DRV8305_Profile`"""
+    words = dict(otterworks_drv8305._DRV8305_RESET_WORDS)
+    for section, settings in profile.items():
+        if section in _METADATA:
+            continue
+        register = otterworks_drv8305._register_number(section)
+        if (register not in otterworks_drv8305._DRV8305_CONTROL_REGISTERS
+                or register == otterworks_drv8305._DRV8305_RESERVED_REGISTER):
+            raise ValueError("{!r} is not a writable control register".format(section))
+        if not isinstance(settings, dict):
+            raise ValueError("register {!r} needs a table of settings".format(section))
+        words[register] = _compile_register(register, settings) & otterworks_drv8305._DRV8305_DATA_MASK
+    words = tuple(words[register] for register in otterworks_drv8305._DRV8305_CONTROL_REGISTERS)
+    image = b"".join(word.to_bytes(2, "big") for word in words)
+    return DRV8305_Profile(profile.get("name", name), words, zlib.crc32(image))
+
+
+def load_profile(path):
+    """Load and compile a ``.toml`` or ``.json`` profile; unchanged files come from the cache"""
+    with open(path, "rb") as f:
+        source = f.read()
+    key = zlib.crc32(source)
+    if key not in _cache:
+        if path.endswith(".toml"):
+            if tomllib is None:
+                raise RuntimeError("TOML profiles need Python 3.11 or later, use JSON")
+            profile = tomllib.loads(source.decode())
+        else:
+            profile = json.loads(source)
+        _cache[key] = compile_profile(profile, name=path)
+    return _cache[key]
@@ -0,0 +1,235 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 M J Stanway for Otter Works LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`otterworks_drv8305_recorder` - compact binary telemetry for the DRV8305
+=========================================================================================
+
+Appends fixed-size 8-byte records (timestamp, register, raw word) to a
+preallocated, memory-mapped ring file, and reads them back with lazy decoding.
+
+File layout, native byte order::
+
+    header, 40 bytes:
+        8s  magic b"DRV8305R"
+        H   byte order mark 0xFEFF
+        H   record size (8)
+        I   capacity, in records
+        Q   records written since the file was created (the ring head)
+        d   time.monotonic() at creation, record timestamps count from here;
+            moved onto the current clock whenever the file is reopened
+        d   time.time() at creation
+    records, 8 bytes each:
+        I   milliseconds since the monotonic epoch, low 32 bits
+        B   register
+        B   flags (bit 0: the frame was a write), and in bits 1 -- 7 bits
+            32 -- 38 of the milliseconds, so timestamps run for 17 years
+        H   raw 16-bit word, most significant byte first on the wire
+
+At 8 bytes per record, 4 status registers read at 10 Hz is 28 MB a day;
+with ``changes_only`` only the words that changed (plus a keyframe per
+register every ``keyframe_interval`` seconds) are kept, which is a few MB for
+days of history on a healthy board.
+
+CPython only.
+
+* Author(s): bluesquall
+"""
+import mmap
+import os
+import struct
+from collections import namedtuple
+from time import monotonic, time
+
+import otterworks_drv8305
+
+
+_HEADER = struct.Struct("=8sHHIQdd") # native byte order, so the mark tells readers which host wrote it
+_EPOCH = struct.Struct("=d")
+_EPOCH_OFFSET = struct.calcsize("=8sHHIQ")
+_MAGIC = b"DRV8305R"
+_BOM = 0xFEFF
+_RECORD_SIZE = 8
+_FLAG_WRITE = 0x01
+_TICK_MASK = (1 << 39) - 1 # milliseconds: 32 bits in the record, the rest above the flags
+
+
+class DRV8305_Sample(namedtuple("DRV8305_Sample", ("timestamp", "register", "word", "flags"))):
+    """One recorded frame; ``timestamp`` is seconds on the recorder's time.monotonic() clock"""
+    __slots__ = ()
+
+    @property
+    def decoded(self):
+        """The word decoded with the register definitions in otterworks_drv8305"""
+        return otterworks_drv8305.DRV8305_SNAPSHOTS.get(self.register, self.word)
+
+    @property
+    def write(self):
+        return bool(self.flags & _FLAG_WRITE)
+
+
+class _Ring_File:
+
+    def __init__(self, f, writable):
+        self._f = f
+        self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        try:
+            if len(self._mm) < _HEADER.size:
+                raise ValueError("not a DRV8305 recording")
+            magic, bom, record_size, self.capacity, _, self.epoch, self.wall_epoch = _HEADER.unpack_from(self._mm)
+            if magic != _MAGIC or record_size != _RECORD_SIZE:
+                raise ValueError("not a DRV8305 recording")
+            if bom != _BOM:
+                raise ValueError("recording was made on a host with the other byte order")
+            if len(self._mm) < _HEADER.size + self.capacity * _RECORD_SIZE:
+                raise ValueError("recording is truncated")
+        except ValueError:
+            self._mm.close()
+            f.close()
+            raise
+        view = memoryview(self._mm)
+        self._head = view[:_HEADER.size].cast("Q") # index 2 is the head counter
+        self._ticks = view[_HEADER.size:].cast("I") # every other entry is a record's timestamp
+        self._halves = view[_HEADER.size:].cast("H") # [4 i + 2] is register | flags << 8, [4 i + 3] the word
+
+    @property
+    def head(self):
+        return self._head[2]
+
+    def close(self):
+        self._head.release()
+        self._ticks.release()
+        self._halves.release()
+        self._mm.close()
+        self._f.close()
+
+
+class DRV8305_Recorder(_Ring_File):
+    """Record raw register words into a preallocated ring file
+
+    Once ``capacity`` records have been written the oldest are overwritten.
+    Appending a record is three stores into the mapped file, nothing is
+    formatted. The recorder can be installed as an
+    :class:`otterworks_drv8305.OtterWorks_DRV8305` trace callback to record
+    every frame on the bus, or fed snapshots with :meth:`record_status`.
+
+    An existing recording at ``path`` is reopened and appended to from its
+    head, e.g. after the service restarts; it must have been made with the
+    same ``capacity``, and anything else at ``path`` raises ValueError rather
+    than being overwritten. Timestamps carry over by wall clock, since the
+    monotonic clock starts again on reboot.
+    """
+
+    def __init__(self, path, capacity=1 << 20, changes_only=False, keyframe_interval=60.0):
+        try:
+            f = open(path, "r+b")
+        except FileNotFoundError:
+            f = open(path, "w+b")
+        if os.fstat(f.fileno()).st_size == 0: # new, or an empty placeholder
+            f.truncate(_HEADER.size + capacity * _RECORD_SIZE)
+            f.write(_HEADER.pack(_MAGIC, _BOM, _RECORD_SIZE, capacity, 0, monotonic(), time()))
+            f.flush()
+            super().__init__(f, writable=True)
+        else:
+            super().__init__(f, writable=True)
+            if self.capacity != capacity:
+                self.close()
+                raise ValueError("{} is a recording of {} records, not {}".format(path, self.capacity, capacity))
+            self.epoch = monotonic() - (time() - self.wall_epoch) # the monotonic instant of wall_epoch, on this boot's clock
+            _EPOCH.pack_into(self._mm, _EPOCH_OFFSET, self.epoch)
+        self._changes_only = changes_only
+        self._keyframe_interval = keyframe_interval
+        self._last_word = {} # register -> last word recorded, for changes_only
+        self._last_time = {} # register -> timestamp of that record
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def record(self, register, word, timestamp=None, flags=0):
+        if timestamp is None:
+            timestamp = monotonic()
+        if self._changes_only:
+            if (self._last_word.get(register) == word
+                    and timestamp - self._last_time[register] < self._keyframe_interval):
+                return
+            self._last_word[register] = word
+            self._last_time[register] = timestamp
+        head = self._head[2]
+        i = head % self.capacity
+        tick = int((timestamp - self.epoch) * 1000) & _TICK_MASK
+        self._ticks[2 * i] = tick & 0xFFFFFFFF
+        self._halves[4 * i + 2] = register | (flags | tick >> 32 << 1) << 8
+        self._halves[4 * i + 3] = word
+        self._head[2] = head + 1
+
+    def __call__(self, register, tx_word, rx_word, timestamp):
+        # trace callback: record what the chip returned for reads, and what was written for writes
+        if tx_word & 0x8000:
+            self.record(register, rx_word, timestamp)
+        else:
+            self.record(register, tx_word & otterworks_drv8305._DRV8305_DATA_MASK, timestamp, _FLAG_WRITE)
+
+    def record_status(self, status):
+        """Record the four words of an :class:`otterworks_drv8305.DRV8305_Status`"""
+        for register, word in zip(otterworks_drv8305._DRV8305_STATUS_REGISTERS, status[1:]):
+            self.record(register, word, status.timestamp)
+
+    def flush(self):
+        self._mm.flush()
+
+
+class DRV8305_Recording(_Ring_File):
+    """Read a recording made by :class:`DRV8305_Recorder`, oldest record first
+
+    Records are only unpacked when indexed or iterated, and only decoded into
+    register snapshots through :attr:`DRV8305_Sample.decoded`.
+    """
+
+    def __init__(self, path):
+        super().__init__(open(path, "rb"), writable=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return min(self.head, self.capacity)
+
+    def __getitem__(self, n):
+        length = len(self)
+        if n < 0:
+            n += length
+        if not 0 <= n < length:
+            raise IndexError("record index out of range")
+        i = (self.head - length + n) % self.capacity
+        flags_register = self._halves[4 * i + 2]
+        tick = self._ticks[2 * i] | flags_register >> 9 << 32
+        return DRV8305_Sample(self.epoch + tick / 1000, flags_register & 0xFF,
+                              self._halves[4 * i + 3], flags_register >> 8 & _FLAG_WRITE)
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
@@ -0,0 +1,138 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 M J Stanway for Otter Works LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`otterworks_drv8305_scheduler` - poll many DRV8305s from one process
+=========================================================================================
+
+Schedules status reads for any number of
+:class:`otterworks_drv8305.OtterWorks_DRV8305` on one or more SPI buses and
+merges them into one timestamped stream. Devices that share a bus and are due
+at the same time are read under a single lock acquisition.
+
+* Author(s): bluesquall
+"""
+from collections import namedtuple
+from time import monotonic, sleep
+
+
+DRV8305_Record = namedtuple("DRV8305_Record", ("timestamp", "name", "status", "lateness"))
+DRV8305_Record.__doc__ = """One status snapshot from the merged stream; ``lateness`` is seconds past the device's deadline"""
+
+class _Scheduled:
+    __slots__ = ("drv8305", "name", "period", "priority", "deadline", "reads", "max_lateness")
+
+    def __init__(self, drv8305, name, period, priority):
+        self.drv8305 = drv8305
+        self.name = name
+        self.period = period
+        self.priority = priority
+        self.deadline = monotonic()
+        self.reads = 0
+        self.max_lateness = 0.0
+
+class DRV8305_Bus_Scheduler:
+    """Deadline scheduler for status reads across several DRV8305s and SPI buses
+
+    Each device is read every ``period`` seconds. When several devices on the
+    same bus are due, they are read in order of ``priority`` (highest first),
+    then deadline, while the bus stays locked; the bus is only reconfigured
+    between devices whose settings differ. ``max_batch`` caps how many devices
+    one lock acquisition may serve, to bound how long the bus is held.
+    """
+
+    def __init__(self, max_batch=None):
+        self._max_batch = max_batch
+        self._buses = {} # busio.SPI -> [_Scheduled]
+
+    def add(self, drv8305, period=1.0, priority=0, name=None):
+        """Schedule ``drv8305`` for a status read every ``period`` seconds"""
+        if name is None:
+            name = "drv8305_{}".format(sum(len(entries) for entries in self._buses.values()))
+        self._buses.setdefault(drv8305._spi.spi, []).append(_Scheduled(drv8305, name, period, priority))
+        return name
+
+    def remove(self, name):
+        for spi, entries in self._buses.items():
+            for entry in entries:
+                if entry.name == name:
+                    entries.remove(entry)
+                    if not entries:
+                        del self._buses[spi]
+                    return
+        raise KeyError(name)
+
+    def stats(self):
+        """Dict of name -> (reads, worst lateness in seconds)"""
+        return {entry.name: (entry.reads, entry.max_lateness)
+                for entries in self._buses.values() for entry in entries}
+
+    def next_deadline(self):
+        return min(entry.deadline for entries in self._buses.values() for entry in entries)
+
+    def poll(self):
+        """Read every device that is due and return their records, oldest first"""
+        records = []
+        now = monotonic()
+        for spi, entries in self._buses.items():
+            due = [entry for entry in entries if entry.deadline <= now]
+            if not due:
+                continue
+            due.sort(key=lambda entry: (-entry.priority, entry.deadline))
+            if self._max_batch is not None:
+                due = due[:self._max_batch]
+            self._read_batch(spi, due, records)
+        records.sort(key=lambda record: record.timestamp)
+        return records
+
+    def _read_batch(self, spi, due, records):
+        while not spi.try_lock():
+            sleep(0)
+        try:
+            configured = None
+            for entry in due:
+                device = entry.drv8305._spi
+                settings = (device.baudrate, device.polarity, device.phase)
+                if settings != configured:
+                    spi.configure(baudrate=device.baudrate, polarity=device.polarity, phase=device.phase)
+                    configured = settings
+                device.chip_select.value = False
+                try:
+                    status = entry.drv8305._read_status_frames(spi)
+                finally:
+                    device.chip_select.value = True
+                lateness = status.timestamp - entry.deadline
+                entry.max_lateness = max(entry.max_lateness, lateness)
+                entry.reads += 1
+                entry.deadline += entry.period
+                if entry.deadline <= status.timestamp: # fell behind, skip the missed periods
+                    entry.deadline += ((status.timestamp - entry.deadline) // entry.period + 1) * entry.period
+                records.append(DRV8305_Record(status.timestamp, entry.name, status, lateness))
+        finally:
+            spi.unlock()
+
+    def __iter__(self):
+        """Yield records forever, sleeping until the next device is due"""
+        while True:
+            delay = self.next_deadline() - monotonic()
+            if delay > 0:
+                sleep(delay)
+            yield from self.poll()
@@ -0,0 +1,266 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 M J Stanway for Otter Works LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`otterworks_drv8305_shared` - share DRV8305 state between processes
+=========================================================================================
+
+One acquisition process owns the SPI bus and the driver, and publishes every
+sample into a ring in ``multiprocessing.shared_memory``. Any number of
+readers in other processes get the latest sample and recent history without
+touching SPI, and without a lock: each slot is guarded by a sequence counter
+(a seqlock) that is odd while the writer is in it.
+
+Layout, native byte order::
+
+    header, 32 bytes:
+        8s  magic b"DRV8305S"
+        H   byte order mark 0xFEFF
+        H   slot size (40)
+        I   capacity, in slots
+        Q   samples published (the ring head)
+        Q   the writer's resource tracker, 0 if unknown (see _attach)
+    slots, 40 bytes each:
+        Q   sequence, odd while being written, 2 x the number of writes when stable
+        d   time.monotonic() of the sample, the same clock in every process
+        24s words of registers 0x01 -- 0x0C, most significant byte first
+
+The seqlock relies on the stores landing in program order, which they do on
+the single-core hosts this driver runs on.
+
+.. code-block:: python
+
+    # acquisition process
+    acquisition = DRV8305_Acquisition(make_drv8305, "drv8305", interval=0.01)
+    acquisition.start()
+
+    # anywhere else
+    reader = DRV8305_Shared_Reader("drv8305")
+    print(reader.latest().status)
+
+CPython only.
+
+* Author(s): bluesquall
+"""
+from collections import namedtuple
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import struct
+from time import monotonic, sleep
+
+import otterworks_drv8305
+
+
+_HEADER = struct.Struct("=8sHHIQQ")
+_MAGIC = b"DRV8305S"
+_BOM = 0xFEFF
+_HEAD = struct.Struct("=Q")
+_HEAD_OFFSET = 16
+_SEQUENCE = struct.Struct("=Q")
+_TIMESTAMP = struct.Struct("=d")
+_SLOT_SIZE = 40
+_WORDS = 24 # registers 0x01 -- 0x0C
+
+
+class DRV8305_Shared_Snapshot(namedtuple("DRV8305_Shared_Snapshot", ("index", "timestamp", "words"))):
+    """One published sample: its position in the stream, time.monotonic() and the 24 raw bytes"""
+    __slots__ = ()
+
+    @property
+    def status(self):
+        return otterworks_drv8305.DRV8305_Status.from_buffer(self.words, self.timestamp)
+
+    @property
+    def config(self):
+        """Control registers 0x05 -- 0x0C, register -> decoded snapshot"""
+        return {register: otterworks_drv8305.DRV8305_SNAPSHOTS.get(
+                    register, (self.words[2 * register - 2] << 8) | self.words[2 * register - 1])
+                for register in otterworks_drv8305._DRV8305_CONTROL_REGISTERS}
+
+
+def _tracker():
+    # identifies this process's resource tracker: processes that share one (forked or spawned
+    # through multiprocessing, or the same process) hold the same pipe to it
+    from multiprocessing import resource_tracker # pylint: disable=import-outside-toplevel
+    fd = getattr(resource_tracker._resource_tracker, "_fd", None) # pylint: disable=protected-access
+    return os.fstat(fd).st_ino if fd is not None else 0
+
+
+def _attach(name):
+    # readers must not unlink the block when they exit, which the resource tracker does before Python 3.13
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker # pylint: disable=import-outside-toplevel
+        shm = shared_memory.SharedMemory(name) # registers the name with this process's tracker
+        writer = _HEADER.unpack_from(shm.buf)[5] if shm.size >= _HEADER.size else 0
+        if writer == 0 or writer != _tracker():
+            resource_tracker.unregister(shm._name, "shared_memory") # pylint: disable=protected-access
+        # else the tracker is the writer's, and the name it holds is the writer's registration: leave it
+        return shm
+
+
+class DRV8305_Shared_Writer:
+    """Create the shared ring ``name`` and publish samples into it; there must only be one writer"""
+
+    def __init__(self, name="drv8305", capacity=1024):
+        self._shm = shared_memory.SharedMemory(name, create=True, size=_HEADER.size + _SLOT_SIZE * capacity)
+        self._buf = self._shm.buf
+        self.capacity = capacity
+        _HEADER.pack_into(self._buf, 0, _MAGIC, _BOM, _SLOT_SIZE, capacity, 0, _tracker())
+        self._head = 0
+
+    def publish(self, timestamp, status, config):
+        """Publish the 8 status bytes from ``readinto_status`` and the 16 bytes of registers 0x05 -- 0x0C"""
+        offset = _HEADER.size + _SLOT_SIZE * (self._head % self.capacity)
+        sequence = _SEQUENCE.unpack_from(self._buf, offset)[0]
+        _SEQUENCE.pack_into(self._buf, offset, sequence + 1) # odd: readers retry
+        _TIMESTAMP.pack_into(self._buf, offset + 8, timestamp)
+        self._buf[offset + 16:offset + 24] = status
+        self._buf[offset + 24:offset + 40] = config
+        _SEQUENCE.pack_into(self._buf, offset, sequence + 2)
+        self._head += 1
+        _HEAD.pack_into(self._buf, _HEAD_OFFSET, self._head)
+
+    def close(self):
+        """Detach and remove the ring; readers that are still attached keep their mapping"""
+        self._buf = None
+        self._shm.close()
+        self._shm.unlink()
+
+
+class DRV8305_Shared_Reader:
+    """Lock-free access to a ring published by :class:`DRV8305_Shared_Writer`"""
+
+    def __init__(self, name="drv8305"):
+        self._shm = _attach(name)
+        self._buf = self._shm.buf
+        magic, bom, slot_size, self.capacity, _, _ = _HEADER.unpack_from(self._buf)
+        if magic != _MAGIC or bom != _BOM or slot_size != _SLOT_SIZE:
+            self.close()
+            raise ValueError("shared memory {!r} is not a DRV8305 ring".format(name))
+
+    @property
+    def head(self):
+        """Number of samples published so far"""
+        return _HEAD.unpack_from(self._buf, _HEAD_OFFSET)[0]
+
+    def read(self, index):
+        """Sample number ``index``, or None if it was overwritten (or not written yet)"""
+        offset = _HEADER.size + _SLOT_SIZE * (index % self.capacity)
+        expected = 2 * (index // self.capacity + 1) # the slot's sequence once this sample is complete
+        for _ in range(1000): # bounded, in case the writer died inside this slot
+            sequence = _SEQUENCE.unpack_from(self._buf, offset)[0]
+            if sequence & 1: # the writer is in this slot, it only takes microseconds
+                continue
+            if sequence != expected:
+                return None
+            timestamp = _TIMESTAMP.unpack_from(self._buf, offset + 8)[0]
+            words = bytes(self._buf[offset + 16:offset + 40])
+            if _SEQUENCE.unpack_from(self._buf, offset)[0] == sequence:
+                return DRV8305_Shared_Snapshot(index, timestamp, words)
+        return None
+
+    def latest(self):
+        """The most recent sample, or None before the first one"""
+        while True:
+            head = self.head
+            if not head:
+                return None
+            snapshot = self.read(head - 1)
+            if snapshot is not None: # None: lapped while reading, try the new head
+                return snapshot
+
+    def history(self, count=None):
+        """Up to ``count`` of the most recent samples still in the ring, oldest first"""
+        head = self.head
+        count = self.capacity if count is None else min(count, self.capacity)
+        snapshots = (self.read(index) for index in range(max(0, head - count), head))
+        return [snapshot for snapshot in snapshots if snapshot is not None]
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+
+
+def _acquire(factory, name, capacity, interval, config_interval, stop):
+    # the acquisition process: owns the driver, publishes a sample every interval
+    drv8305 = factory()
+    writer = DRV8305_Shared_Writer(name, capacity)
+    status = bytearray(8)
+    config = bytearray(16)
+    next_config = 0
+    deadline = monotonic()
+    try:
+        while not stop.is_set():
+            drv8305.readinto_status(status)
+            now = monotonic()
+            if now >= next_config:
+                for register, snapshot in drv8305.refresh().items():
+                    word = snapshot.as_word
+                    config[2 * register - 10] = word >> 8
+                    config[2 * register - 9] = word & 0xFF
+                next_config = now + config_interval
+            writer.publish(now, status, config)
+            deadline += interval
+            delay = deadline - monotonic()
+            if delay > 0:
+                sleep(delay)
+            else:
+                deadline = monotonic() # fell behind, realign rather than sample in a burst
+    finally:
+        writer.close()
+
+
+class DRV8305_Acquisition:
+    """Run the driver in its own process and publish its state to the shared ring ``name``
+
+    ``factory`` is called in the new process to build the
+    :class:`otterworks_drv8305.OtterWorks_DRV8305`, so the SPI bus is only
+    ever opened there; it must be picklable, e.g. a module-level function.
+    The status registers are published every ``interval`` seconds, with the
+    control registers re-read every ``config_interval`` seconds.
+    """
+
+    def __init__(self, factory, name="drv8305", capacity=1024, interval=0.01, config_interval=1.0):
+        self._args = (factory, name, capacity, interval, config_interval)
+        self._stop = multiprocessing.Event()
+        self._process = None
+
+    def start(self):
+        self._stop.clear()
+        self._process = multiprocessing.Process(target=_acquire, args=self._args + (self._stop,),
+                                                name="drv8305-acquisition", daemon=True)
+        self._process.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._process is not None:
+            self._process.join()
+            self._process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
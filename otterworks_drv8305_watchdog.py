@@ -0,0 +1,244 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 M J Stanway for Otter Works LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`otterworks_drv8305_watchdog` - keep the DRV8305 SPI watchdog serviced
+=========================================================================================
+
+Enables the DRV8305 watchdog (EN_WD, WD_DLY in the IC operation register) and
+services it from a dedicated thread by reading register 0x01 well inside the
+window. If the host can no longer keep up, the keeper fails safe actively:
+it drives EN_GATE low (when given the pin) and puts the chip to SLEEP. Going
+quiet would not be enough, since every status read by any other poller
+(``read_status``, the monitor, the scheduler, ...) also services the watchdog.
+
+CPython only. The keeper takes the same bus lock (``busio.SPI.try_lock``) as
+every other transaction, so it can run next to normal polling; keep every
+other bus user on the driver or on the same ``busio.SPI`` object. Waiting for
+the lock counts against the window: a keeper starved by a busy poller fails
+safe at the end of the window instead of hanging on the lock.
+
+* Author(s): bluesquall
+"""
+from array import array
+import os
+import threading
+from time import monotonic, sleep
+
+import otterworks_drv8305
+
+
+_WATCHDOG_DELAYS = (0.010, 0.020, 0.050, 0.100) # seconds, by WD_DLY code
+_SLEEP = 0x0004 # in the IC operation register
+
+DRV8305_JITTER_BUCKETS = (10e-6, 20e-6, 50e-6, 100e-6, 200e-6, 500e-6, 1e-3, 2e-3, 5e-3, 10e-3)
+"""Upper edges, in seconds, of the service jitter histogram; one more bucket counts anything larger"""
+
+
+class DRV8305_Watchdog_Keeper:
+    """Service the DRV8305 watchdog from a high-priority thread
+
+    The watchdog is enabled with the shortest WD_DLY window that is at least
+    ``delay`` seconds, and serviced every ``margin`` of that window against
+    absolute deadlines. The thread sleeps until ``spin`` seconds before each
+    deadline, then spins, and asks for ``SCHED_FIFO`` at ``priority`` when the
+    process is allowed to.
+
+    Every service interval is recorded: ``histogram`` counts the absolute
+    difference from the nominal period in :data:`DRV8305_JITTER_BUCKETS`, and
+    ``near_misses`` counts intervals longer than ``near_miss`` of the window.
+    After ``max_near_misses`` consecutive near misses, one interval longer
+    than the window, or a window that ends before the bus could be locked,
+    the keeper fails safe: it stops servicing, sets ``failed``, drives
+    ``en_gate`` (a ``digitalio.DigitalInOut``, optional) low and calls
+    ``on_fail(reason)`` from its thread, none of which needs the bus. It then
+    sets SLEEP in the IC operation register and reads it back, in bus sessions
+    that give up after a window when the bus stays busy, until that verifies
+    (``asleep`` is then True) or the keeper is stopped.
+    """
+
+    def __init__(self, drv8305, delay=0.1, margin=0.5, priority=50, spin=200e-6,
+                 near_miss=0.8, max_near_misses=3, on_fail=None, en_gate=None):
+        for code, window in enumerate(_WATCHDOG_DELAYS):
+            if window >= delay:
+                break
+        else:
+            raise ValueError("the DRV8305 watchdog window is at most {} s".format(_WATCHDOG_DELAYS[-1]))
+        self._drv8305 = drv8305
+        self._code = code
+        self.window = window
+        self.period = margin * window
+        self._priority = priority
+        self._spin = spin
+        self._near_miss = near_miss * window
+        self._max_near_misses = max_near_misses
+        self._on_fail = on_fail
+        self._en_gate = en_gate
+        self._tx = bytearray((0x80 | otterworks_drv8305._DRV8305_WARNING_WATCHDOG_REGISTER << 3, 0))
+        self._rx = bytearray(2)
+        self._stop = threading.Event()
+        self._thread = None
+        self.realtime = False # True once SCHED_FIFO was granted
+        self.services = 0
+        self.histogram = array("L", [0] * (len(DRV8305_JITTER_BUCKETS) + 1))
+        self.worst_interval = 0.0
+        self.near_misses = 0
+        self.failed = None # reason, once the keeper has failed safe
+        self.asleep = False # True once the fail-safe SLEEP write read back
+
+    def start(self):
+        """Enable the watchdog and start servicing it"""
+        self._service() # open the window from a known point
+        self._drv8305.configure().set("ic_op", watchdog_delay=self._code, enable_watchdog=1).commit()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="drv8305-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self, disable=True):
+        """Stop servicing, and with ``disable`` turn the watchdog off first so it doesn't trip"""
+        if disable:
+            self._drv8305.configure().set("ic_op", enable_watchdog=0).commit()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _begin(self, limit):
+        # as SPIDevice.__enter__, which spins on the lock forever; this gives up at limit and returns None
+        device = self._drv8305._spi
+        spi = device.spi
+        while not spi.try_lock():
+            if limit is not None and monotonic() > limit:
+                return None
+            sleep(0)
+        try:
+            spi.configure(baudrate=device.baudrate, polarity=device.polarity, phase=device.phase)
+        except BaseException:
+            spi.unlock()
+            raise
+        device.chip_select.value = getattr(device, "cs_active_value", False)
+        return spi
+
+    def _end(self, spi):
+        device = self._drv8305._spi
+        device.chip_select.value = not getattr(device, "cs_active_value", False)
+        spi.unlock()
+
+    def _service(self, limit=None):
+        spi = self._begin(limit)
+        if spi is None:
+            return False
+        try:
+            spi.write_readinto(self._tx, self._rx)
+        finally:
+            self._end(spi)
+        return True
+
+    def _sleep(self, limit):
+        # set SLEEP as DRV8305_Configuration.commit() would: read, write, read back; but in a session that gives up at limit
+        drv8305 = self._drv8305
+        register = otterworks_drv8305._DRV8305_IC_OPERATION_REGISTER
+        read = otterworks_drv8305._DRV8305_READ | register << 11
+        spi = self._begin(limit)
+        if spi is None:
+            return False
+        try:
+            word = drv8305._exchange_frames(spi, [read])[0] & otterworks_drv8305._DRV8305_DATA_MASK
+            word = (word | _SLEEP) & ~otterworks_drv8305._DRV8305_SELF_CLEARING[register]
+            device = drv8305._spi # end the read frame, as _exchange_frames does between its own
+            device.chip_select.value = not getattr(device, "cs_active_value", False)
+            device.chip_select.value = getattr(device, "cs_active_value", False)
+            readback = drv8305._exchange_frames(spi, [register << 11 | word, read])[1] & otterworks_drv8305._DRV8305_DATA_MASK
+        finally:
+            self._end(spi)
+        if drv8305._cache_policy != otterworks_drv8305._DRV8305_CACHE_ALWAYS_READ:
+            drv8305._store_shadow(register, readback)
+        return readback == word
+
+    def _set_realtime(self):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self._priority)) # 0 is the calling thread on Linux
+            self.realtime = True
+        except (AttributeError, OSError): # not Linux, or not allowed
+            self.realtime = False
+
+    def _fail(self, reason):
+        self.failed = reason # stop servicing, and don't rely on the watchdog tripping: other pollers service it too
+        try:
+            if self._en_gate is not None:
+                self._en_gate.value = False # needs no bus, so it works even while a poller hogs it
+            if self._on_fail is not None:
+                self._on_fail(reason)
+        finally:
+            while not self._stop.is_set(): # the bus may be what failed: never block on it
+                if self._sleep(monotonic() + self.window):
+                    self.asleep = True
+                    break
+                self._stop.wait(self.period)
+
+    def _run(self):
+        if self._priority is not None:
+            self._set_realtime()
+        period = self.period
+        last = monotonic()
+        deadline = last + period
+        consecutive = 0
+        while not self._stop.is_set():
+            delay = deadline - monotonic() - self._spin
+            if delay > 0:
+                sleep(delay)
+            while monotonic() < deadline:
+                pass
+            if not self._service(last + self.window):
+                self._fail("bus not available within the {:.0f} ms watchdog window".format(1e3 * self.window))
+                return
+            now = monotonic()
+            interval = now - last
+            last = now
+            self.services += 1
+            jitter = abs(interval - period)
+            bucket = 0
+            while bucket < len(DRV8305_JITTER_BUCKETS) and jitter > DRV8305_JITTER_BUCKETS[bucket]:
+                bucket += 1
+            self.histogram[bucket] += 1
+            if interval > self.worst_interval:
+                self.worst_interval = interval
+            if interval > self.window:
+                self._fail("watchdog window missed: {:.1f} ms between services".format(1e3 * interval))
+                return
+            if interval > self._near_miss:
+                self.near_misses += 1
+                consecutive += 1
+                if consecutive >= self._max_near_misses:
+                    self._fail("{} near misses in a row, last {:.1f} ms".format(consecutive, 1e3 * interval))
+                    return
+            else:
+                consecutive = 0
+            deadline += period
+            if deadline < now: # fell behind, realign rather than service in a burst
+                deadline = now + period
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# A steady-state poll with readinto_status() must not allocate: nothing in the
+# driver, in SPIDevice, or in the (allocation-free) stand-in bus below may
+# raise tracemalloc's peak.
+
+import tracemalloc
+
+from adafruit_bus_device.spi_device import SPIDevice
+import otterworks_drv8305
+
+N = 200 # stays below 257, larger ints are allocated
+
+class _QuietSPI:
+    """busio.SPI stand-in that answers every frame from a fixed image without allocating"""
+    def __init__(self):
+        self.image = bytearray(b"\x04\x00\x00\x00\x00\x00\x00\x00") # FAULT set in 0x01
+    def try_lock(self):
+        return True
+    def unlock(self):
+        pass
+    def configure(self, baudrate=100000, polarity=0, phase=0, bits=8):
+        pass
+    def write_readinto(self, buffer_out, buffer_in, out_start=0, out_end=None, in_start=0, in_end=None):
+        buffer_in[in_start] = self.image[out_start]
+        buffer_in[in_start + 1] = self.image[out_start + 1]
+
+class _Pin:
+    value = True
+    def switch_to_output(self, value=True, drive_mode=None):
+        self.value = value
+
+device = SPIDevice(_QuietSPI(), _Pin(), polarity=0, phase=1)
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(device, None)
+buf = bytearray(8)
+clear = drv8305.readinto_status(buf) # warm up
+
+tracemalloc.start()
+tracemalloc.reset_peak()
+current = tracemalloc.get_traced_memory()[0]
+i = 0
+while i < N: # a for loop would allocate its iterator
+    clear = drv8305.readinto_status(buf)
+    drv8305.readinto_register(0x07, buf)
+    i += 1
+peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+
+print("bytes allocated over {} polls: {}".format(N, peak - current))
+assert peak == current
+assert not clear
+assert otterworks_drv8305.DRV8305_Status.from_buffer(b"\x04\x00\x00\x00\x00\x00\x00\x00").wwr.fault
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Leaving the asyncio facade's context waits for the SPI transfer in flight
+# without blocking the event loop: a ticker on the same loop keeps running
+# while a slow read (four 50 ms frames on the emulator) finishes.
+
+import asyncio
+from time import monotonic
+
+import otterworks_drv8305
+import otterworks_drv8305_async
+import otterworks_drv8305_emulator
+
+chip = otterworks_drv8305_emulator.DRV8305_Emulator(latency=0.05)
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(chip, None)
+
+
+async def ticker(ticks):
+    while True:
+        ticks.append(monotonic())
+        await asyncio.sleep(0.01)
+
+
+async def main():
+    ticks = []
+    ticking = asyncio.ensure_future(ticker(ticks))
+    async with otterworks_drv8305_async.OtterWorks_DRV8305_Async(drv8305) as facade:
+        read = asyncio.ensure_future(facade.read_status())
+        await asyncio.sleep(0.02) # the read is on the worker thread now
+    assert read.done() and read.result() is not None, "left the context before the read finished"
+    ticking.cancel()
+    worst = max(later - earlier for earlier, later in zip(ticks, ticks[1:]))
+    assert worst < 0.1, "the event loop was blocked for {:.0f} ms".format(1e3 * worst)
+    print("async: closed while the loop kept running, worst gap {:.0f} ms".format(1e3 * worst))
+
+asyncio.run(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Offline analysis of a long recording: the vectorized module against a
+# per-record Python loop over DRV8305_Sample.decoded, and a check that both
+# count the same rising edges. Needs NumPy.
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import otterworks_drv8305
+import otterworks_drv8305_analysis
+import otterworks_drv8305_recorder
+
+N = 2000000 # records, a few weeks of status reads at 1 Hz
+LOOP = 200000 # records for the Python loop, which is scaled up
+
+path = os.path.join(tempfile.mkdtemp(), "bench.rec")
+otterworks_drv8305_recorder.DRV8305_Recorder(path, capacity=N).close()
+
+# synthetic history: the four status registers read in turn every 250 ms,
+# mostly clear, with short bursts of overcurrent and the odd overtemp warning
+rng = np.random.default_rng(1)
+records = np.zeros(N, dtype=otterworks_drv8305_analysis._RECORD)
+records["ticks"] = np.arange(N) * 250
+records["register"] = np.tile(otterworks_drv8305._DRV8305_STATUS_REGISTERS, N // 4)
+burst = np.repeat(rng.random(N // 40) < 0.01, 40)
+records["word"][(records["register"] == 0x02) & burst] = 1 << 10 # high_a
+records["word"][(records["register"] == 0x01) & burst] = 1 << 10 # FAULT
+records["word"][(records["register"] == 0x01) & (rng.random(N) < 0.001)] |= 1 # overtemp
+with open(path, "r+b") as f:
+    header = otterworks_drv8305_recorder._HEADER
+    fields = list(header.unpack(f.read(header.size)))
+    fields[4] = N # head
+    f.seek(0)
+    f.write(header.pack(*fields))
+    records.tofile(f)
+
+t0 = time.perf_counter()
+timestamps, registers, words = otterworks_drv8305_analysis.load_recording(path)
+columns = otterworks_drv8305_analysis.unpack(timestamps, registers, words)
+summary = otterworks_drv8305_analysis.fault_summary(timestamps, registers, words)
+matrix = otterworks_drv8305_analysis.co_occurrence(timestamps, registers, words)
+vectorized = time.perf_counter() - t0
+print("vectorized: {:8.2f} s for {} records".format(vectorized, N))
+
+with otterworks_drv8305_recorder.DRV8305_Recording(path) as recording:
+    t0 = time.perf_counter()
+    raised = {}
+    previous = {}
+    for n in range(LOOP):
+        sample = recording[n]
+        snapshot = otterworks_drv8305._decode(sample.register, sample.word)
+        for field, value in zip(snapshot._fields, snapshot):
+            if value and not previous.get((sample.register, field)):
+                raised[(sample.register, field)] = raised.get((sample.register, field), 0) + 1
+            previous[(sample.register, field)] = value
+    looped = (time.perf_counter() - t0) * N / LOOP
+print("    looped: {:8.2f} s, estimated from {} records".format(looped, LOOP))
+
+check = otterworks_drv8305_analysis.fault_summary(timestamps[:LOOP], registers[:LOOP], words[:LOOP])
+assert {flag: count for flag, (count, _, _) in check.items()} == raised, "rising edge counts disagree"
+for flag, (count, seconds, _) in sorted(summary.items()):
+    print("{:>14}: raised {:5d} times, set {:9.1f} s".format(otterworks_drv8305_analysis.flag_name(flag), count, seconds))
+os.remove(path)
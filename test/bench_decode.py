@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Decode throughput: ctypes bitfield union vs the table-driven snapshots.
+# Each decode turns a raw 16-bit word into an object, timed alone and then
+# with every field read back.
+
+import time
+
+import otterworks_drv8305
+
+N = 50000
+
+CASES = [
+    ("wwr", otterworks_drv8305.DRV8305_Warning_Watchdog_Reset),
+    ("oc", otterworks_drv8305.DRV8305_Overcurrent),
+    ("drive", otterworks_drv8305.DRV8305_Drive_Control),
+    ("shunt", otterworks_drv8305.DRV8305_Shunt_Amplifier),
+]
+
+def ctypes_decode(name, word, fields):
+    u = otterworks_drv8305._DRV8305_SPI_Word()
+    u[0] = word >> 8
+    u[1] = word & 0xFF
+    s = getattr(u, name)
+    return [getattr(s, f) for f in fields]
+
+def table_decode(snapshot, word, fields):
+    s = snapshot.from_word(word)
+    return [getattr(s, f) for f in fields]
+
+def ctypes_word(name, word):
+    u = otterworks_drv8305._DRV8305_SPI_Word()
+    u[0] = word >> 8
+    u[1] = word & 0xFF
+    return getattr(u, name)
+
+def best(decode, *args):
+    # decodes/s, best of 5 runs: the slower runs measure the machine, not the decoder
+    runs = []
+    for _ in range(5):
+        t0 = time.perf_counter()
+        for i in range(N):
+            decode(*args[:1] + (i & 0x7FF,) + args[1:])
+        runs.append(time.perf_counter() - t0)
+    return N / min(runs)
+
+for name, snapshot in CASES:
+    fields = snapshot._fields
+    for word in range(0, 0x800, 0x7F): # decoders agree before we time them
+        assert ctypes_decode(name, word, fields) == table_decode(snapshot, word, fields)
+    ctypes_only = best(ctypes_word, name)
+    table_only = best(snapshot.from_word)
+    ctypes_all = best(ctypes_decode, name, fields)
+    table_all = best(table_decode, snapshot, fields)
+    print("{:>6}: decode ctypes {:8.0f}/s table {:8.0f}/s ({:.1f}x); with every field read ctypes {:8.0f}/s table {:8.0f}/s ({:.1f}x)".format(
+        name, ctypes_only, table_only, table_only / ctypes_only, ctypes_all, table_all, table_all / ctypes_all))
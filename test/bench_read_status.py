@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Compare read_status() against the four separate _get_* calls.
+#
+#   python3 test/bench_read_status.py          # emulated chip, measures driver overhead only
+#   python3 test/bench_read_status.py spi0     # real DRV8305 on BeagleBone Black SPI0, CS on P9_17
+
+import sys
+import time
+
+import otterworks_drv8305
+
+N = 2000
+
+if len(sys.argv) > 1 and sys.argv[1] == "spi0":
+    import board
+    import busio
+    import digitalio
+    spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
+    cs = digitalio.DigitalInOut(board.P9_17)
+    drv8305 = otterworks_drv8305.OtterWorks_DRV8305(spi, cs)
+else:
+    import otterworks_drv8305_emulator
+    drv8305 = otterworks_drv8305.OtterWorks_DRV8305(otterworks_drv8305_emulator.DRV8305_Emulator(), None)
+    spi = drv8305._spi.spi
+
+def four_calls():
+    drv8305._get_warning_watchdog_reset()
+    drv8305._get_overcurrent()
+    drv8305._get_ic_fault()
+    drv8305._get_vgs_fault()
+
+def bench(name, fn):
+    locks, frames = getattr(spi, "locks", 0), getattr(spi, "frames", 0)
+    t0 = time.perf_counter()
+    for _ in range(N):
+        fn()
+    dt = time.perf_counter() - t0
+    print("{:>12}: {:8.1f} snapshots/s, {:8.1f} us/snapshot, {:.0f} lock(s) and {:.0f} frame(s) per snapshot".format(
+        name, N / dt, 1e6 * dt / N,
+        (getattr(spi, "locks", 0) - locks) / N, (getattr(spi, "frames", 0) - frames) / N))
+
+bench("_get_* x4", four_calls)
+bench("read_status", drv8305.read_status)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Driver performance against the in-process emulator, so regressions show up
+# on any Linux box:
+#
+#   python3 test/bench_suite.py                  # no bus latency, driver overhead only
+#   python3 test/bench_suite.py 20e-6            # add 20 us per frame
+
+import sys
+import time
+import tracemalloc
+
+import otterworks_drv8305
+import otterworks_drv8305_emulator
+
+N = 5000
+
+chip = otterworks_drv8305_emulator.DRV8305_Emulator(latency=float(sys.argv[1]) if len(sys.argv) > 1 else 0.0)
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(chip, None)
+
+def report(name, value, unit):
+    print("{:>36}: {:10.2f} {}".format(name, value, unit))
+
+def timed(fn, n=N):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples
+
+# transactions per second and per-read latency, single register
+samples = timed(lambda: drv8305._read_register(0x01))
+report("_read_register", len(samples) / sum(samples), "transactions/s")
+report("_read_register latency, median", 1e6 * samples[len(samples) // 2], "us")
+report("_read_register latency, p99", 1e6 * samples[int(0.99 * len(samples))], "us")
+
+# a full status poll cycle
+frames = chip.spi.frames
+samples = timed(drv8305.read_status)
+report("read_status", len(samples) / sum(samples), "snapshots/s")
+report("read_status latency, median", 1e6 * samples[len(samples) // 2], "us")
+report("read_status latency, p99", 1e6 * samples[int(0.99 * len(samples))], "us")
+report("frames per read_status", (chip.spi.frames - frames) / len(samples), "")
+
+# the same cycle into a caller-owned buffer
+buf = bytearray(8)
+samples = timed(lambda: drv8305.readinto_status(buf))
+report("readinto_status latency, median", 1e6 * samples[len(samples) // 2], "us")
+
+# cached control register read
+samples = timed(drv8305._get_drive_control)
+report("_get_drive_control (cached), median", 1e6 * samples[len(samples) // 2], "us")
+
+# decode cost alone, and through the interning cache that status properties use
+status = drv8305.read_status()
+samples = timed(lambda: [otterworks_drv8305._decode(register, word)
+                         for register, word in zip(otterworks_drv8305._DRV8305_STATUS_REGISTERS, status[1:])])
+report("decode 4 status words, median", 1e6 * samples[len(samples) // 2], "us")
+samples = timed(lambda: (status.wwr, status.oc, status.ic_fault, status.vgs))
+report("interned 4 status words, median", 1e6 * samples[len(samples) // 2], "us")
+
+# allocations per poll cycle, once warm
+drv8305.read_status()
+tracemalloc.start()
+before = tracemalloc.take_snapshot()
+tracemalloc.reset_peak()
+base = tracemalloc.get_traced_memory()[0]
+for _ in range(N):
+    drv8305.read_status()
+peak = tracemalloc.get_traced_memory()[1] - base
+after = tracemalloc.take_snapshot()
+tracemalloc.stop()
+retained = sum(stat.size_diff for stat in after.compare_to(before, "filename")
+               if stat.traceback[0].filename == otterworks_drv8305.__file__)
+report("read_status peak transient memory", peak, "bytes")
+report("read_status retained memory per poll", retained / N, "bytes")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Cost of the trace hook on _read_register: disabled, ring buffer, and printing.
+# Also checks that the disabled path never formats a string and does not
+# retain any memory.
+
+import contextlib
+import os
+import sys
+import time
+import tracemalloc
+
+import otterworks_drv8305
+import otterworks_drv8305_emulator
+
+N = 20000
+
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(otterworks_drv8305_emulator.DRV8305_Emulator(), None)
+
+def bench(name, trace):
+    drv8305.trace = trace
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        t0 = time.perf_counter()
+        for _ in range(N):
+            drv8305._read_register(0x01)
+        dt = time.perf_counter() - t0
+    print("{:>10}: {:6.2f} us/read".format(name, 1e6 * dt / N))
+
+bench("disabled", None)
+bench("ring", otterworks_drv8305.DRV8305_Trace_Ring())
+bench("print", otterworks_drv8305.print_trace)
+
+# no formatting: count every call to format(), print() or a __repr__ while tracing is disabled
+drv8305.trace = None
+formatting = []
+def _profile(frame, event, arg):
+    if event == "c_call" and arg.__name__ in ("format", "print", "__format__", "__repr__"):
+        formatting.append(arg.__name__)
+    elif event == "call" and frame.f_code.co_name == "__repr__":
+        formatting.append("__repr__")
+sys.setprofile(_profile)
+for _ in range(100):
+    drv8305._read_register(0x01)
+sys.setprofile(None)
+print("formatting calls with tracing disabled: {}".format(len(formatting)))
+
+# no allocations: nothing is retained across reads once the path is warm
+tracemalloc.start()
+drv8305._read_register(0x01)
+before = tracemalloc.take_snapshot()
+for _ in range(N):
+    drv8305._read_register(0x01)
+after = tracemalloc.take_snapshot()
+tracemalloc.stop()
+grown = sum(stat.size_diff for stat in after.compare_to(before, "lineno")
+            if stat.traceback[0].filename == otterworks_drv8305.__file__)
+print("bytes retained by the driver over {} reads with tracing disabled: {}".format(N, grown))
+
+assert not formatting
+assert grown <= 0
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# The keeper, the async executor and the scheduler drive one driver from
+# several threads: a write racing another thread's read must still reach the
+# chip, and each read must return its own register.
+
+import sys
+import threading
+
+import otterworks_drv8305
+import otterworks_drv8305_emulator
+
+sys.setswitchinterval(1e-6) # switch threads as often as possible
+
+chip = otterworks_drv8305_emulator.DRV8305_Emulator()
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(chip, None)
+stop = threading.Event()
+wrong = []
+
+
+def reader():
+    while not stop.is_set():
+        word = drv8305._read_register(0x09)
+        if word & otterworks_drv8305._DRV8305_DATA_MASK != chip.registers[0x09]:
+            wrong.append(word)
+
+thread = threading.Thread(target=reader)
+thread.start()
+lost = 0
+try:
+    for _ in range(20000):
+        chip.registers[0x0A] = 0
+        drv8305._write_register(0x0A, 0x155)
+        if chip.registers[0x0A] != 0x155:
+            lost += 1
+finally:
+    stop.set()
+    thread.join()
+assert lost == 0, "{} writes went out as another thread's frame".format(lost)
+assert not wrong, wrong[:5]
+print("concurrency: ok")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# DRV8305_Configuration against the emulator: commit() writes only the words
+# that change, verifies them by readback in the same bus session, keeps the
+# shadow cache right (CLR_FLTS included), and set() rejects values that don't
+# fit their field.
+
+import otterworks_drv8305
+import otterworks_drv8305_emulator
+
+chip = otterworks_drv8305_emulator.DRV8305_Emulator()
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(chip, None)
+
+# first commit reads the unknown register, then writes and reads back in one more session
+locks = chip.spi.locks
+with drv8305.configure() as config:
+    config.set("drive", dead_time=3)
+assert chip.registers[0x07] == 0x236, hex(chip.registers[0x07])
+assert chip.spi.locks - locks == 2, chip.spi.locks - locks
+assert drv8305._get_drive_control().dead_time == 3
+
+# unchanged values are not written: the shadow says so, no bus traffic at all
+locks, frames = chip.spi.locks, chip.spi.frames
+assert drv8305.configure().set("drive", dead_time=3).commit() == []
+assert (chip.spi.locks, chip.spi.frames) == (locks, frames)
+
+# several registers in one commit, only the changed ones written
+frames = chip.spi.frames
+written = drv8305.configure().set("shunt", gain_1=2, gain_2=2).set("drive", dead_time=3).commit()
+assert written == [0x0A], written
+assert chip.spi.frames - frames == 3, chip.spi.frames - frames # the read of 0x0A, its write and its readback
+assert chip.registers[0x0A] == 0x00A, hex(chip.registers[0x0A])
+
+# readback that doesn't match raises
+chip.registers[0x08] = 0
+try:
+    drv8305._apply({0x08: {"data": 5}}) # 0x08 ignores writes
+except RuntimeError as error:
+    print("unverified write raised:", error)
+else:
+    raise AssertionError("an unverified write did not raise")
+
+# out-of-range values are rejected before anything is staged
+for value in (-1, 8, 9, 1.5):
+    try:
+        drv8305.configure().set("drive", dead_time=value)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("dead_time={} was accepted".format(value))
+try:
+    drv8305.configure().set("drive", no_such_field=1)
+except ValueError:
+    pass
+else:
+    raise AssertionError("an unknown field was accepted")
+
+# CLR_FLTS through the setter and through commit() leaves no drift behind
+chip.inject("oc", "high_a")
+chip.clear("oc", "high_a")
+drv8305._set_ic_operation(drv8305._get_ic_operation()._replace(clear_faults=1))
+assert not drv8305.read_status().oc_word
+assert drv8305.verify() == [] and drv8305.cache_drift == 0, drv8305.cache_drift
+drv8305.configure().set("ic_op", clear_faults=1).commit()
+assert drv8305.verify() == [] and drv8305.cache_drift == 0, drv8305.cache_drift
+print("configuration: ok")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# DRV8305_Flight_Recorder against the emulator, sampled by hand: a raised
+# fault dumps pre samples, the trigger sample and post samples once the
+# post-trigger window fills, across a wrapped ring; a fault that stays set
+# doesn't trigger again, and the recorder re-arms for the next one.
+
+import os
+import tempfile
+
+import otterworks_drv8305
+import otterworks_drv8305_emulator
+import otterworks_drv8305_flight
+
+PRE = 20
+POST = 5
+
+chip = otterworks_drv8305_emulator.DRV8305_Emulator()
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(chip, None)
+path = os.path.join(tempfile.mkdtemp(), "fault-{:02d}.bin")
+recorder = otterworks_drv8305_flight.DRV8305_Flight_Recorder(drv8305, path, pre=PRE, post=POST)
+
+
+def sample(n):
+    for _ in range(n):
+        recorder.sample()
+
+sample(3 * recorder.capacity + 7) # clear, and wrapped a few times
+assert recorder.dumps == 0
+chip.inject("oc", "high_a")
+sample(POST) # the trigger and all but the last post-trigger sample
+assert recorder.dumps == 0, "dumped before the post-trigger window filled"
+sample(1)
+assert recorder.dumps == 1, recorder.dumps
+
+dump = otterworks_drv8305_flight.DRV8305_Flight_Dump(path.format(0))
+assert dump.number == 0
+assert len(dump.statuses) == PRE + 1 + POST, len(dump.statuses)
+assert dump.trigger_index == PRE, dump.trigger_index
+trigger = dump.statuses[dump.trigger_index]
+assert trigger.wwr.fault and trigger.oc.high_a, trigger
+assert dump.trigger_time == trigger.timestamp
+assert len(dump.pre_trigger) == PRE and not any(status.wwr.fault for status in dump.pre_trigger)
+assert len(dump.post_trigger) == POST and all(status.wwr.fault for status in dump.post_trigger)
+timestamps = [status.timestamp for status in dump.statuses]
+assert timestamps == sorted(timestamps), "samples out of order"
+
+# still latched: no new edge, no new dump
+sample(2 * recorder.capacity)
+assert recorder.dumps == 1, recorder.dumps
+
+# cleared, then raised again: re-armed, and the dump only holds samples taken since the last one
+chip.clear("oc", "high_a")
+drv8305._set_ic_operation(drv8305._get_ic_operation()._replace(clear_faults=1))
+recorder.sample()
+assert not recorder._high
+sample(3)
+chip.inject("vgs", "low_b")
+sample(POST + 1)
+assert recorder.dumps == 2, recorder.dumps
+dump = otterworks_drv8305_flight.DRV8305_Flight_Dump(path.format(1))
+assert dump.number == 1
+assert len(dump.pre_trigger) == PRE and len(dump.post_trigger) == POST, (len(dump.pre_trigger), len(dump.post_trigger))
+assert dump.statuses[dump.trigger_index].vgs.low_b
+assert not dump.pre_trigger[-1].wwr.fault
+print("flight: ok")
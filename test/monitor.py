@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# DRV8305_Monitor's intervals can be changed while it runs, as the monitor
+# service does on reload: a shorter heartbeat interval applies to the
+# heartbeat already scheduled, not only after the old one has run out.
+
+import otterworks_drv8305
+import otterworks_drv8305_emulator
+
+now = [1000.0]
+otterworks_drv8305.monotonic = lambda: now[0] # the driver's clock only
+
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(otterworks_drv8305_emulator.DRV8305_Emulator(), None)
+monitor = otterworks_drv8305.DRV8305_Monitor(drv8305, heartbeat_interval=60, config_interval=60)
+heartbeats = []
+refreshes = []
+monitor.subscribe(lambda event: heartbeats.append(now[0]) if isinstance(event, otterworks_drv8305.DRV8305_Heartbeat) else None)
+refresh = drv8305.refresh
+drv8305.refresh = lambda: refreshes.append(now[0]) or refresh()
+
+monitor.poll() # heartbeat and config read at 1000, the next ones due at 1060
+now[0] += 5
+monitor.heartbeat_interval = 10
+monitor.config_interval = 20
+monitor.poll()
+assert heartbeats == [1000.0] and refreshes == [1000.0], (heartbeats, refreshes)
+now[0] += 5
+monitor.poll()
+assert heartbeats == [1000.0, 1010.0], heartbeats
+now[0] += 10
+monitor.poll()
+assert refreshes == [1000.0, 1020.0], refreshes
+assert heartbeats == [1000.0, 1010.0, 1020.0], heartbeats
+
+monitor.heartbeat_interval = None
+now[0] += 100
+monitor.poll()
+assert heartbeats == [1000.0, 1010.0, 1020.0], heartbeats
+monitor.heartbeat_interval = 30 # back on: the first heartbeat is due straight away
+monitor.poll()
+assert heartbeats == [1000.0, 1010.0, 1020.0, 1120.0], heartbeats
+print("monitor: ok")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# poll_status() against the emulator, on a hand-driven clock: it backs off by
+# doubling from poll_fast up to poll_slow, as set after construction, reads
+# at once on an nFAULT edge, and holds poll_fast until poll_hold has passed
+# with the flags clear.
+
+import otterworks_drv8305
+import otterworks_drv8305_emulator
+
+now = [1000.0]
+otterworks_drv8305.monotonic = lambda: now[0] # the driver's clock only
+
+chip = otterworks_drv8305_emulator.DRV8305_Emulator()
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(chip, None, nfault=chip.nfault)
+drv8305.poll_fast = 0.5 # after construction: must still apply before the first fault
+drv8305.poll_slow = 4.0
+drv8305.poll_hold = 2.0
+
+
+def poll_after(seconds):
+    now[0] += seconds
+    frames = chip.spi.frames
+    status = drv8305.poll_status()
+    assert (status is None) == (chip.spi.frames == frames), (status, chip.spi.frames - frames)
+    return status
+
+# back-off: 0.5 doubled on the first clear read, then 2, 4 and capped at poll_slow
+assert poll_after(0) is not None
+for interval in (1.0, 2.0, 4.0, 4.0):
+    assert poll_after(interval - 0.01) is None, interval
+    assert poll_after(0.01) is not None, interval
+
+# lowering poll_slow takes effect from the next read
+drv8305.poll_slow = 1.0
+assert poll_after(4.0) is not None
+assert poll_after(1.0) is not None
+
+# an nFAULT edge reads straight away, without waiting for the interval
+chip.inject("oc", "high_a")
+status = poll_after(0)
+assert status is not None and status.oc_word, status
+assert poll_after(0) is None # no new edge, and the interval hasn't passed
+
+# while the flag is set, and for poll_hold after it clears, poll_fast
+assert poll_after(0.5) is not None
+chip.clear("oc", "high_a")
+drv8305._set_ic_operation(drv8305._get_ic_operation()._replace(clear_faults=1))
+status = poll_after(0.5)
+assert status is not None and status.clear, status
+assert poll_after(0.5) is not None and poll_after(0.5) is not None
+assert poll_after(0.5) is not None # poll_hold has passed: back off again
+assert poll_after(0.99) is None
+assert poll_after(0.01) is not None
+print("polling: ok")
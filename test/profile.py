@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# otterworks_drv8305_profile: the example profile compiles to the words the
+# datasheet tables give for its settings, unsupported or malformed values are
+# rejected, and apply()/drift() work against the emulator.
+
+import json
+import os
+import tempfile
+
+import otterworks_drv8305
+import otterworks_drv8305_emulator
+import otterworks_drv8305_profile
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples", "drv8305_profile.toml")
+
+EXPECTED = (
+    0x344, # hs: 1780 ns (3), 60 mA sink (4), 50 mA source (4)
+    0x344, # ls: the same
+    0x2B6, # drive: freewheeling as at power-on, 3-PWM (01), 440 ns dead time (3), 1.75 us blanking (1), 3.5 us deglitch (2)
+    0x000, # reserved
+    0x020, # ic_op: as at power-on
+    0x06A, # shunt: 0.5 us blanking (1), 40 V/V on all three channels (2)
+    0x10A, # vreg: as at power-on
+    0x2A8, # vsen: 0.730 V threshold (21), latched shutdown (0)
+)
+
+profile = otterworks_drv8305_profile.load_profile(EXAMPLE)
+assert profile.name == "example: 3-PWM, 40 V/V shunts", profile.name
+assert profile.words == EXPECTED, [hex(word) for word in profile.words]
+assert otterworks_drv8305_profile.load_profile(EXAMPLE) is profile # unchanged: from the cache
+
+# the same settings as JSON compile to the same image
+with open(os.path.join(tempfile.mkdtemp(), "profile.json"), "w") as f:
+    json.dump({"hs": {"drive_time_ns": 1780, "sink_current_ma": 60, "source_current_ma": 50},
+               "ls": {"t_driven": 3, "i_peak_sink": 4, "i_peak_source": 4}, # raw codes
+               "drive": {"dead_time_ns": 440, "vds_blanking_us": 1.75, "vds_deglitch_us": 3.5, "pwm_mode": 3},
+               "shunt": {"gain_1": 40, "gain_2": 40, "gain_3": 40, "blanking_us": 0.5},
+               "vsen": {"vds_threshold_v": 0.73, "vds_mode": "latched"}}, f)
+assert otterworks_drv8305_profile.load_profile(f.name).checksum == profile.checksum
+
+for bad in ({"drive": {"dead_time_ns": 100}}, # between supported settings
+            {"shunt": {"gain_1": 2}}, # gain_N is in V/V, not a raw code
+            {"drive": {"dead_time": 8}}, # does not fit the 3-bit field
+            {"drive": {"dead_time_ns": [440]}},
+            {"drive": {"dead_time": None}},
+            {"drive": {"no_such_setting": 1}},
+            {"status": {"fault": 1}}, # not a writable control register
+            {"reserved": {"data": 1}},
+            {"drive": 3}):
+    try:
+        otterworks_drv8305_profile.compile_profile(bad)
+    except ValueError as error:
+        assert type(error) is ValueError
+    else:
+        raise AssertionError("{} was accepted".format(bad))
+
+# apply writes and verifies the image in one session; drift() reports what changes afterwards
+chip = otterworks_drv8305_emulator.DRV8305_Emulator()
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(chip, None)
+locks = chip.spi.locks
+profile.apply(drv8305)
+assert chip.spi.locks - locks == 1, chip.spi.locks - locks
+assert tuple(chip.registers[0x05:0x0D]) == EXPECTED, [hex(word) for word in chip.registers[0x05:0x0D]]
+assert drv8305._get_drive_control().dead_time == 3 # the shadow has the image too
+assert profile.drift(drv8305) == []
+chip.registers[0x07] ^= 0x004
+chip.registers[0x0C] = otterworks_drv8305_emulator.DRV8305_DEFAULTS[0x0C]
+assert profile.drift(drv8305) == [0x07, 0x0C], profile.drift(drv8305)
+print("profile: ok")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# DRV8305_Recorder reopens an existing ring and carries on from its head,
+# refuses to overwrite anything that isn't a matching recording, and records
+# what was written for write frames.
+
+import os
+import tempfile
+from time import monotonic
+
+import otterworks_drv8305
+import otterworks_drv8305_emulator
+import otterworks_drv8305_recorder
+
+directory = tempfile.mkdtemp()
+path = os.path.join(directory, "drv8305.rec")
+
+with otterworks_drv8305_recorder.DRV8305_Recorder(path, capacity=8) as recorder:
+    for word in range(5):
+        recorder.record(0x01, word)
+with otterworks_drv8305_recorder.DRV8305_Recorder(path, capacity=8) as recorder: # a restart
+    assert recorder.head == 5, recorder.head
+    for word in range(5, 10):
+        recorder.record(0x01, word)
+with otterworks_drv8305_recorder.DRV8305_Recording(path) as recording:
+    assert [sample.word for sample in recording] == list(range(2, 10)), list(recording)
+    assert abs(recording[-1].timestamp - monotonic()) < 1.0, recording[-1]
+
+try:
+    otterworks_drv8305_recorder.DRV8305_Recorder(path, capacity=16)
+except ValueError as error:
+    print("capacity mismatch raised:", error)
+else:
+    raise AssertionError("a recording of another capacity was reopened")
+
+other = os.path.join(directory, "notes.txt")
+with open(other, "w") as f:
+    f.write("not a recording")
+try:
+    otterworks_drv8305_recorder.DRV8305_Recorder(other)
+except ValueError:
+    pass
+else:
+    raise AssertionError("a file that isn't a recording was accepted")
+with open(other) as f:
+    assert f.read() == "not a recording"
+
+# as a trace callback, a write frame records the word written, not what the chip clocked out
+chip = otterworks_drv8305_emulator.DRV8305_Emulator()
+path = os.path.join(directory, "trace.rec")
+with otterworks_drv8305_recorder.DRV8305_Recorder(path, capacity=16) as recorder:
+    drv8305 = otterworks_drv8305.OtterWorks_DRV8305(chip, None, trace=recorder)
+    drv8305._write_register(0x07, 0x236)
+    drv8305._read_register(0x07)
+with otterworks_drv8305_recorder.DRV8305_Recording(path) as recording:
+    samples = [(sample.register, sample.word, sample.write) for sample in recording]
+assert samples == [(0x07, 0x236, True), (0x07, 0x236, False)], samples
+
+# timestamps past the 32-bit millisecond count (49.7 days) read back right, from both readers
+path = os.path.join(directory, "long.rec")
+day = 24 * 3600.0
+with otterworks_drv8305_recorder.DRV8305_Recorder(path, capacity=8) as recorder:
+    epoch = recorder.epoch
+    for days in (1, 49, 60, 400):
+        recorder.record(0x01, days, epoch + days * day, otterworks_drv8305_recorder._FLAG_WRITE if days == 60 else 0)
+with otterworks_drv8305_recorder.DRV8305_Recording(path) as recording:
+    for sample in recording:
+        assert abs(sample.timestamp - (epoch + sample.word * day)) < 0.002, sample
+        assert sample.write == (sample.word == 60) and sample.flags in (0, 1), sample
+try:
+    import otterworks_drv8305_analysis
+except ImportError: # needs numpy
+    pass
+else:
+    timestamps, _, words = otterworks_drv8305_analysis.load_recording(path, writes=True)
+    assert all(abs(t - (epoch + w * day)) < 0.002 for t, w in zip(timestamps, words)), (timestamps, words)
+print("recorder: ok")
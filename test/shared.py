@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# A DRV8305_Shared_Reader in the writer's process tree shares its resource
+# tracker, so it must leave the writer's registration alone: otherwise the
+# tracker prints a KeyError when the writer unlinks the ring. A reader in an
+# unrelated process must not take the ring with it when it exits.
+
+import subprocess
+import sys
+
+SCENARIO = """
+import subprocess, sys
+import otterworks_drv8305_shared
+
+writer = otterworks_drv8305_shared.DRV8305_Shared_Writer("drv8305-test", 4)
+writer.publish(0.0, bytes(8), bytes(16))
+reader = otterworks_drv8305_shared.DRV8305_Shared_Reader("drv8305-test") # same process, same tracker
+assert reader.head == 1, reader.head
+reader.close()
+subprocess.run([sys.executable, "-c", "import otterworks_drv8305_shared; "
+                "otterworks_drv8305_shared.DRV8305_Shared_Reader('drv8305-test').close()"], check=True)
+reader = otterworks_drv8305_shared.DRV8305_Shared_Reader("drv8305-test") # still there
+reader.close()
+writer.close()
+"""
+
+result = subprocess.run([sys.executable, "-c", SCENARIO], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                        universal_newlines=True, check=False)
+assert result.returncode == 0, result.stderr
+assert "Error" not in result.stderr and "leaked" not in result.stderr, result.stderr
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# The watchdog keeper against the emulator: it keeps up next to normal
+# polling, and when a bus hog starves it past the window it fails safe
+# actively (EN_GATE low, SLEEP set) rather than relying on the watchdog,
+# which the other pollers keep servicing.
+
+import time
+
+import otterworks_drv8305
+import otterworks_drv8305_emulator
+import otterworks_drv8305_watchdog
+
+SLEEP = 1 << 2 # in the IC operation register
+
+class Pin:
+    value = True
+
+def poll(drv8305, seconds, rate=50):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        drv8305.read_status()
+        time.sleep(1 / rate)
+
+# keeps up next to 50 Hz polling
+chip = otterworks_drv8305_emulator.DRV8305_Emulator()
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(chip, None)
+keeper = otterworks_drv8305_watchdog.DRV8305_Watchdog_Keeper(drv8305, priority=None)
+with keeper:
+    poll(drv8305, 0.6)
+assert keeper.failed is None, keeper.failed
+assert keeper.services >= 6, keeper.services
+assert not drv8305._get_ic_fault().watchdog
+print("polled alongside: {} services, worst interval {:.1f} ms".format(keeper.services, 1e3 * keeper.worst_interval))
+
+# starved by a bus hog: fails within the window, and the chip stays asleep while polling carries on
+chip = otterworks_drv8305_emulator.DRV8305_Emulator()
+drv8305 = otterworks_drv8305.OtterWorks_DRV8305(chip, None)
+en_gate = Pin()
+failures = []
+keeper = otterworks_drv8305_watchdog.DRV8305_Watchdog_Keeper(drv8305, priority=None, en_gate=en_gate,
+                                                             on_fail=failures.append)
+keeper.start()
+time.sleep(0.2)
+assert chip.spi.try_lock()
+time.sleep(2 * keeper.window)
+assert keeper.failed is not None, "keeper did not notice it was starved"
+assert not en_gate.value, "EN_GATE still high"
+assert failures == [keeper.failed], "on_fail waited for the bus"
+assert not keeper.asleep
+chip.spi.unlock() # the hog lets go: SLEEP goes in, verified
+deadline = time.monotonic() + 1.0
+while not keeper.asleep and time.monotonic() < deadline:
+    time.sleep(0.01)
+assert keeper.asleep, "SLEEP not verified once the bus was free"
+keeper.stop(disable=False)
+print("starved: {}".format(keeper.failed))
+assert drv8305._get_ic_operation().sleep # the shadow agrees with the chip
+poll(drv8305, 0.5)
+assert chip.registers[0x09] & SLEEP, "SLEEP not set"
+print("fail-safe held through 0.5 s of polling")